@@ -37,14 +37,35 @@ else
     echo ""
 fi
 
+# Python für die Datenbank-Sicherung (venv bevorzugt)
+PYTHON=python3
+[ -x ".venv/bin/python" ] && PYTHON=".venv/bin/python"
+
 # Datenbanken sichern
+# Die Datenbank läuft im WAL-Modus: frisch geschriebene Daten stehen bis zum
+# nächsten Checkpoint in "<db>-wal". Ein einfaches cp der .db würde sie
+# verpassen, daher über die SQLite-Backup-API kopieren (konsistent, auch
+# während die Web-App läuft).
 echo -e "\n${YELLOW}Sichere Datenbanken...${NC}"
 DB_COUNT=0
 for db in *.db; do
     if [ -f "$db" ]; then
-        cp "$db" "${BACKUP_DIR}/"
-        echo -e "${GREEN}✓${NC} $db"
-        ((DB_COUNT++))
+        if "$PYTHON" - "$db" "${BACKUP_DIR}/$db" <<'PYEOF'
+import sqlite3, sys
+src = sqlite3.connect(sys.argv[1])
+dst = sqlite3.connect(sys.argv[2])
+with dst:
+    src.backup(dst)
+dst.execute("PRAGMA journal_mode=DELETE")
+dst.close()
+src.close()
+PYEOF
+        then
+            echo -e "${GREEN}✓${NC} $db"
+            ((DB_COUNT++))
+        else
+            echo -e "${RED}✗ Sicherung fehlgeschlagen: $db${NC}"
+        fi
     fi
 done
 
@@ -5,152 +5,200 @@ SEPA-Lastschriftmandat PDF Generator
 Erstellt eine Vorlage basierend auf dem Original-Dokument
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+from pypdf import PdfReader, PdfWriter
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
-from reportlab.lib.colors import black
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 
-def create_sepa_mandate_pdf(filename="SEPA_Lastschriftmandat_Vorlage.pdf"):
-    """Erstellt ein SEPA-Lastschriftmandat PDF"""
+# Layout-Konstanten (einmalig in Punkte umgerechnet)
+X_LEFT = 20*mm        # linker Rand für Boxen und Feldbeschriftungen
+X_TEXT = 22*mm        # Text innerhalb der Boxen
+X_RIGHT_BOX = 112*mm  # rechte Box (Mandatsreferenz / Einmalige Zahlung)
+X_RIGHT_TEXT = 114*mm
+BOX_W = 170*mm        # volle Breite
+BOX_W_LEFT = 90*mm    # linke Box (Gläubiger)
+BOX_W_RIGHT = 78*mm   # rechte Box (Mandatsreferenz)
+TITLE_H = 10*mm
+FIELD_H = 7*mm
+CHECKBOX = 4*mm
+LINE_DY = 3.5*mm      # Zeilenabstand Ermächtigungstext
+LABEL_DY = 3*mm       # Abstand Feldbeschriftung -> Box
+ROW_DY = 10*mm        # Abstand zwischen zwei Eingabefeldern
+
+# Ab so vielen Dateien schreibt create_many() parallel
+BULK_THREAD_THRESHOLD = 32
+
+H = A4[1]             # Seitenhöhe, alle y-Werte werden von oben gemessen
+
+# y der ersten Feldbeschriftung ("Zahlungspflichtiger")
+PAYER_FIELDS_TOP = H - 163*mm
+PAYER_ROW_DY = LABEL_DY + ROW_DY
+PAYER_FIELD_LABELS = (
+    "Zahlungspflichtiger",
+    "Straße und Hausnummer",
+    "PLZ und Ort",
+    "Land",
+    "IBAN",
+    "SWIFT BIC",
+)
+
+# y der Unterschriftslinien (Ort, Datum, Unterschrift)
+SIGNATURE_Y = H - 251*mm
+SIGNATURE_LINES = ((X_LEFT, 70*mm), (90*mm, 125*mm), (140*mm, 190*mm))
+
+# Ermächtigungstext - Links (Deutsch)
+TEXT_DE_TOP = H - 108*mm
+TEXT_DE = (
+    "Ich ermächtige (Wir ermächtigen) die Apotheke am Damm,",
+    "Zahlungen von meinem (unserem) Konto mittels Lastschrift",
+    "einzuziehen. Zugleich weise ich mein (weisen wir unser)",
+    "Kreditinstitut an, die von der Apotheke am Damm auf mein",
+    "(unser) Konto gezogenen Lastschriften einzulösen.",
+    "",
+    "Hinweis: Ich kann (wir können) innerhalb von acht",
+    "Wochen, beginnend mit dem Belastungsdatum, die",
+    "Erstattung des belasteten Betrages verlangen. Es gelten",
+    "dabei die mit meinem (unserem) Kreditinstitut vereinbarten",
+    "Bedingungen.",
+)
+
+# Statisches Layout der Vorlage: Rahmen als absolute (x, y, w, h),
+# einmalig beim Import berechnet
+LAYOUT = {
+    "title_box": (X_LEFT, H - 48*mm, BOX_W, TITLE_H),
+    "creditor_box": (X_LEFT, H - 82*mm, BOX_W_LEFT, 25*mm),
+    "creditor_id_box": (X_LEFT, H - 98*mm, BOX_W_LEFT, TITLE_H),
+    "mandate_ref_box": (X_RIGHT_BOX, H - 98*mm, BOX_W_RIGHT, TITLE_H),
+    "recurring_checkbox": (X_TEXT, H - 156*mm, CHECKBOX, CHECKBOX),
+    "single_checkbox": (X_RIGHT_BOX, H - 156*mm, CHECKBOX, CHECKBOX),
+}
+LAYOUT.update({
+    f"payer_field_{idx}": (X_LEFT, PAYER_FIELDS_TOP - idx * PAYER_ROW_DY - LABEL_DY - 5*mm, BOX_W, FIELD_H)
+    for idx in range(len(PAYER_FIELD_LABELS))
+})
+
+# Texte der Vorlage als absolute (x, y, text), nach Schrift gruppiert
+TEMPLATE_TEXTS = {
+    ("Helvetica-Bold", 12): (
+        (X_TEXT, H - 45*mm, "SEPA-Basis-Lastschriftmandat"),
+    ),
+    ("Helvetica-Bold", 10): (
+        (X_TEXT, H - 67*mm, "Apotheke am Damm"),
+        (X_TEXT, H - 95*mm, "DE45ZZZ00002778112"),
+    ),
+    ("Helvetica", 10): (
+        (X_TEXT, H - 72*mm, "Am Damm 17"),
+        (X_TEXT, H - 77*mm, "55232 Alzey"),
+    ),
+    ("Helvetica-Bold", 9): (
+        (X_RIGHT_TEXT, H - 95*mm, "Wird separat mitgeteilt!"),
+    ),
+    ("Helvetica", 8): (
+        (28*mm, H - 155*mm, "Wiederkehrende Zahlung"),
+        (118*mm, H - 155*mm, "Einmalige Zahlung"),
+    ),
+    ("Helvetica", 7): (
+        (X_LEFT, H - 55*mm, "Name und Anschrift des Zahlungsempfängers (Gläubiger)"),
+        *((X_TEXT, TEXT_DE_TOP - idx * LINE_DY, line) for idx, line in enumerate(TEXT_DE) if line),
+        *((X_LEFT, PAYER_FIELDS_TOP - idx * PAYER_ROW_DY, label) for idx, label in enumerate(PAYER_FIELD_LABELS)),
+        (X_LEFT, SIGNATURE_Y - LABEL_DY, "Ort"),
+        (90*mm, SIGNATURE_Y - LABEL_DY, "Datum"),
+        (140*mm, SIGNATURE_Y - LABEL_DY, "Unterschrift(en)"),
+    ),
+    ("Helvetica", 6): (
+        (X_TEXT, H - 101*mm, "Gläubiger-Identifikationsnummer"),
+        (X_RIGHT_TEXT, H - 101*mm, "Mandatsreferenz"),
+    ),
+}
+
+
+@lru_cache(maxsize=1)
+def _render_template_bytes() -> bytes:
+    """Rendert die (immer identische) Vorlage einmal in den Speicher."""
+
+    # PDF erstellen: komprimierter Content-Stream, invariant=1 lässt
+    # Zeitstempel und Dokument-ID weg, damit die Bytes reproduzierbar sind
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4, pageCompression=1, invariant=1)
+
+    # Ein Textblock (BT/ET) pro Schrift, Positionen sind absolut
+    for (font_name, font_size), entries in TEMPLATE_TEXTS.items():
+        text = c.beginText()
+        text.setFont(font_name, font_size)
+        for x, y, line in entries:
+            text.setTextOrigin(x, y)
+            text.textOut(line)
+        c.drawText(text)
+
+    # Rahmen und Unterschriftslinien in einer einzigen Stroke-Operation
+    path = c.beginPath()
+    for box in LAYOUT.values():
+        path.rect(*box)
+    for x1, x2 in SIGNATURE_LINES:
+        path.moveTo(x1, SIGNATURE_Y)
+        path.lineTo(x2, SIGNATURE_Y)
+    c.drawPath(path, stroke=1, fill=0)
 
-    # PDF erstellen
-    c = canvas.Canvas(filename, pagesize=A4)
-    width, height = A4
+    c.save()
+    return buffer.getvalue()
 
-    # Startposition oben
-    y_pos = height - 40*mm
 
-    # Überschrift - SEPA-Basis-Lastschriftmandat
-    c.setFont("Helvetica-Bold", 12)
-    c.rect(20*mm, y_pos - 8*mm, 170*mm, 10*mm, stroke=1, fill=0)
-    c.drawString(22*mm, y_pos - 5*mm, "SEPA-Basis-Lastschriftmandat")
+def fill_sepa_mandate(customer_name: str, street: str = "", city: str = "") -> bytes:
+    """
+    Erstellt ein SEPA-Lastschriftmandat mit eingetragenen Kundendaten.
 
-    y_pos -= 15*mm
+    Die Vorlage wird nur einmal gerendert; pro Kunde wird lediglich ein
+    kleines Overlay mit Name, Straße und Ort darübergelegt.
+    """
+    overlay_buffer = BytesIO()
+    c = canvas.Canvas(overlay_buffer, pagesize=A4, pageCompression=1)
+    c.setFont("Helvetica", 10)
+    for idx, value in enumerate((customer_name, street, city)):
+        if value:
+            y = PAYER_FIELDS_TOP - idx * PAYER_ROW_DY - LABEL_DY - 3.5*mm
+            c.drawString(X_TEXT, y, value)
+    c.save()
 
-    # Zahlungsempfänger Box
-    c.setFont("Helvetica", 7)
-    c.drawString(20*mm, y_pos, "Name und Anschrift des Zahlungsempfängers (Gläubiger)")
+    # Vorlage pro Aufruf neu einlesen: merge_page verändert die Seite in-place
+    page = PdfReader(BytesIO(_render_template_bytes())).pages[0]
+    page.merge_page(PdfReader(overlay_buffer).pages[0])
 
-    y_pos -= 7*mm
-    c.rect(20*mm, y_pos - 20*mm, 90*mm, 25*mm, stroke=1, fill=0)
+    writer = PdfWriter()
+    writer.add_page(page)
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
 
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(22*mm, y_pos - 5*mm, "Apotheke am Damm")
-    c.setFont("Helvetica", 10)
-    c.drawString(22*mm, y_pos - 10*mm, "Am Damm 17")
-    c.drawString(22*mm, y_pos - 15*mm, "55232 Alzey")
-
-    y_pos -= 28*mm
-
-    # Gläubiger-ID und Mandatsreferenz
-    c.rect(20*mm, y_pos - 8*mm, 90*mm, 10*mm, stroke=1, fill=0)
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(22*mm, y_pos - 5*mm, "DE45ZZZ00002778112")
-
-    c.rect(112*mm, y_pos - 8*mm, 78*mm, 10*mm, stroke=1, fill=0)
-    c.setFont("Helvetica-Bold", 9)
-    c.drawString(114*mm, y_pos - 5*mm, "Wird separat mitgeteilt!")
-
-    c.setFont("Helvetica", 6)
-    c.drawString(22*mm, y_pos - 11*mm, "Gläubiger-Identifikationsnummer")
-    c.drawString(114*mm, y_pos - 11*mm, "Mandatsreferenz")
-
-    y_pos -= 18*mm
-
-    # Ermächtigungstext - Links (Deutsch)
-    c.setFont("Helvetica", 7)
-    text_de = [
-        "Ich ermächtige (Wir ermächtigen) die Apotheke am Damm,",
-        "Zahlungen von meinem (unserem) Konto mittels Lastschrift",
-        "einzuziehen. Zugleich weise ich mein (weisen wir unser)",
-        "Kreditinstitut an, die von der Apotheke am Damm auf mein",
-        "(unser) Konto gezogenen Lastschriften einzulösen.",
-        "",
-        "Hinweis: Ich kann (wir können) innerhalb von acht",
-        "Wochen, beginnend mit dem Belastungsdatum, die",
-        "Erstattung des belasteten Betrages verlangen. Es gelten",
-        "dabei die mit meinem (unserem) Kreditinstitut vereinbarten",
-        "Bedingungen."
-    ]
-
-    y_text = y_pos
-    for line in text_de:
-        c.drawString(22*mm, y_text, line)
-        y_text -= 3.5*mm
-
-    y_pos -= 45*mm
-
-    # Checkboxen
-    c.setFont("Helvetica", 8)
-    # Wiederkehrende Zahlung
-    c.rect(22*mm, y_pos - 3*mm, 4*mm, 4*mm, stroke=1, fill=0)
-    c.drawString(28*mm, y_pos - 2*mm, "Wiederkehrende Zahlung")
-
-    # Einmalige Zahlung
-    c.rect(112*mm, y_pos - 3*mm, 4*mm, 4*mm, stroke=1, fill=0)
-    c.drawString(118*mm, y_pos - 2*mm, "Einmalige Zahlung")
-
-    y_pos -= 10*mm
-
-    # Zahlungspflichtiger Felder
-    c.setFont("Helvetica", 7)
-
-    # Name
-    c.drawString(20*mm, y_pos, "Zahlungspflichtiger")
-    y_pos -= 3*mm
-    c.rect(20*mm, y_pos - 5*mm, 170*mm, 7*mm, stroke=1, fill=0)
-    y_pos -= 10*mm
-
-    # Straße und Hausnummer
-    c.drawString(20*mm, y_pos, "Straße und Hausnummer")
-    y_pos -= 3*mm
-    c.rect(20*mm, y_pos - 5*mm, 170*mm, 7*mm, stroke=1, fill=0)
-    y_pos -= 10*mm
-
-    # PLZ und Ort
-    c.drawString(20*mm, y_pos, "PLZ und Ort")
-    y_pos -= 3*mm
-    c.rect(20*mm, y_pos - 5*mm, 170*mm, 7*mm, stroke=1, fill=0)
-    y_pos -= 10*mm
-
-    # Land
-    c.drawString(20*mm, y_pos, "Land")
-    y_pos -= 3*mm
-    c.rect(20*mm, y_pos - 5*mm, 170*mm, 7*mm, stroke=1, fill=0)
-    y_pos -= 10*mm
-
-    # IBAN
-    c.drawString(20*mm, y_pos, "IBAN")
-    y_pos -= 3*mm
-    c.rect(20*mm, y_pos - 5*mm, 170*mm, 7*mm, stroke=1, fill=0)
-    y_pos -= 10*mm
-
-    # SWIFT BIC
-    c.drawString(20*mm, y_pos, "SWIFT BIC")
-    y_pos -= 3*mm
-    c.rect(20*mm, y_pos - 5*mm, 170*mm, 7*mm, stroke=1, fill=0)
-    y_pos -= 20*mm
-
-    # Unterschriftenbereich
-    c.setFont("Helvetica", 7)
-
-    # Ort
-    c.line(20*mm, y_pos, 70*mm, y_pos)
-    c.drawString(20*mm, y_pos - 3*mm, "Ort")
-
-    # Datum
-    c.line(90*mm, y_pos, 125*mm, y_pos)
-    c.drawString(90*mm, y_pos - 3*mm, "Datum")
-
-    # Unterschrift
-    c.line(140*mm, y_pos, 190*mm, y_pos)
-    c.drawString(140*mm, y_pos - 3*mm, "Unterschrift(en)")
-
-    # PDF speichern
-    c.save()
+
+def create_sepa_mandate_pdf(filename="SEPA_Lastschriftmandat_Vorlage.pdf"):
+    """Erstellt ein SEPA-Lastschriftmandat PDF"""
+    with open(filename, "wb") as f:
+        f.write(_render_template_bytes())
     print(f"PDF erfolgreich erstellt: {filename}")
 
+
+def create_many(filenames, max_workers=4):
+    """Schreibt die Vorlage in mehrere Dateien (einmal gerendert, N-mal geschrieben)"""
+    filenames = list(filenames)
+    template_bytes = _render_template_bytes()
+
+    def _write(filename):
+        with open(filename, "wb") as f:
+            f.write(template_bytes)
+
+    # Reines Datei-I/O gibt den GIL frei, daher lohnen Threads erst ab einigen Dateien
+    if len(filenames) < BULK_THREAD_THRESHOLD:
+        for filename in filenames:
+            _write(filename)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(_write, filenames))
+    print(f"{len(filenames)} PDFs erfolgreich erstellt")
+
+
 if __name__ == "__main__":
     create_sepa_mandate_pdf()
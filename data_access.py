@@ -14,7 +14,7 @@ from datetime import datetime, date, timedelta
 from typing import Any, Dict, List, Optional, Tuple
 
 from config import SORT_COLUMN_MAP, normalize_sort_params, sql_last_word
-from invoice_tracker import init_db
+from invoice_tracker import init_db, open_conn
 
 
 @dataclass
@@ -139,7 +139,7 @@ def fetch_invoices(
     - from_month: Start month in YYYY-MM format
     - to_month: End month in YYYY-MM format
     """
-    with sqlite3.connect(database_path) as conn:
+    with open_conn(database_path) as conn:
         conn.row_factory = sqlite3.Row
         # Register helper used in ORDER BY to sort by surname
         conn.create_function("LAST_WORD", 1, sql_last_word)
@@ -419,7 +419,7 @@ def fetch_all_customers(database_path: str) -> List[Dict]:
     Returns a list of customer dictionaries with name, address, email, notes.
     Custom name/street/city from customer_details will override invoice data if present.
     """
-    with sqlite3.connect(database_path) as conn:
+    with open_conn(database_path) as conn:
         conn.row_factory = sqlite3.Row
         init_db(conn)
 
@@ -505,7 +505,7 @@ def fetch_invoices_with_reminders(database_path: str, filter_reminded: Optional[
                         If None, show all open invoices.
         hide_never_remind: If True (default), hide customers with never_remind flag set. If False, show all.
     """
-    with sqlite3.connect(database_path) as conn:
+    with open_conn(database_path) as conn:
         conn.row_factory = sqlite3.Row
 
         # Get the latest snapshot date
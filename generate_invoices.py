@@ -12,13 +12,22 @@ from __future__ import annotations
 
 import calendar
 import random
+import re
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import date, timedelta
+from functools import lru_cache
+from io import BytesIO
+from multiprocessing.pool import Pool
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 BASE_DIR = Path(__file__).resolve().parent
 TARGET_ROOT = BASE_DIR / "Rechnungen_Test"
+WRITE_WORKERS = 8
+RENDER_CHUNKSIZE = 8
 
 PAGE_HEIGHT_MM = 297.0
 MM_TO_PT = 72 / 25.4
@@ -166,6 +175,36 @@ class Product:
     vat_rate: int
 
 
+@dataclass
+class InvoiceItem:
+    # __slots__ statt Dict pro Position: weniger Speicher, schnellerer Attributzugriff
+    __slots__ = (
+        "delivery_note",
+        "name",
+        "category",
+        "pzn",
+        "pack",
+        "quantity",
+        "price_net",
+        "price_gross",
+        "line_total",
+        "vat_rate",
+        "delivery_date",
+    )
+
+    delivery_note: str
+    name: str
+    category: str
+    pzn: str
+    pack: str
+    quantity: int
+    price_net: float
+    price_gross: float
+    line_total: float
+    vat_rate: int
+    delivery_date: date
+
+
 MEDICATIONS: List[Product] = [
     Product("SILAPO 10.000 I.E./1,0 ml Inj.-Lösung", 460.99, "Medikament", 19),
     Product("ARANESP 130 µg Injektionslösung", 1167.49, "Medikament", 19),
@@ -199,6 +238,18 @@ CLOSING_NOTES = [
     "Wir bedanken uns für Ihr Vertrauen in die Apotheke am Damm.",
 ]
 
+# Zahlungswahrscheinlichkeit pro Monat nach Alter der Rechnung (Index = Monate)
+PAID_PROBABILITY_BY_AGE = (
+    0.0,  # Neue Rechnungen: bleiben alle offen
+    0.50,  # Nach 1 Monat: 50% bezahlt
+    0.30,  # Nach 2 Monaten: weitere 30% bezahlt
+    0.15,  # Nach 3 Monaten: weitere 15% bezahlt
+    0.04,  # Nach 4-6 Monaten: weitere 4% pro Monat bezahlt
+    0.04,
+    0.04,
+    0.01,  # Nach 6+ Monaten: nur noch 1% pro Monat bezahlt (chronische Mahnfälle)
+)
+
 PHARMACY_LINES = [
     "Apotheke am Damm",
     "Am Damm 17",
@@ -232,9 +283,13 @@ COLUMN_RELATIVE_POSITIONS = {
     "vat": 0.89,
 }
 
+COLUMN_X = {
+    key: CONTENT_LEFT_X + rel * CONTENT_WIDTH for key, rel in COLUMN_RELATIVE_POSITIONS.items()
+}
+
 
 def column_x(key: str) -> float:
-    return CONTENT_LEFT_X + COLUMN_RELATIVE_POSITIONS[key] * CONTENT_WIDTH
+    return COLUMN_X[key]
 
 INFO_FIELDS = ("Datum:", "Kunden-Nr:", "Rechnungs-Nr:")
 ADDITIONAL_INFO_TEMPLATES = (
@@ -270,107 +325,120 @@ CHAR_WIDTH_OVERRIDES = {
 }
 DEFAULT_CHAR_WIDTH = 500
 
+# Breitentabelle pro cp1252-Byte, damit _text_width ohne Dict-Lookups auskommt
+_WIDTH_TABLE = array("H", [DEFAULT_CHAR_WIDTH]) * 256
+for _ch, _width in CHAR_WIDTH_OVERRIDES.items():
+    _WIDTH_TABLE[_ch.encode("cp1252")[0]] = _width
+
+
+# Zeichen, die in PDF-Stringliteralen mit Backslash maskiert werden müssen
+_ESCAPE_RE = re.compile(r"[\\()]")
+
+
+@lru_cache(maxsize=4096)
+def _escape(text: str) -> str:
+    # Fast alle Texte enthalten keine Sonderzeichen: dann ohne Kopie zurück
+    if _ESCAPE_RE.search(text) is None:
+        return text
+    return _ESCAPE_RE.sub(r"\\\g<0>", text)
+
+
+@lru_cache(maxsize=4096)
+def _text_width(text: str, size: float) -> float:
+    # Nicht kodierbare Zeichen werden zu "?" und erhalten so die Standardbreite
+    total_units = sum(map(_WIDTH_TABLE.__getitem__, text.encode("cp1252", errors="replace")))
+    return (total_units / 1000.0) * size
+
+
+@lru_cache(maxsize=4096)
+def _pdf_string(text: str) -> bytes:
+    """Maskierter, cp1252-kodierter Inhalt eines PDF-Stringliterals."""
+    return _escape(text).encode("cp1252", errors="replace")
+
+
+@lru_cache(maxsize=4096)
+def _text_op_parts(text: str, size: float, bold: bool) -> Tuple[bytes, bytes]:
+    """Liefert den festen Teil eines Text-Operators vor und nach der Position."""
+    font = b"F2" if bold else b"F1"
+    return b"BT /%s %.2f Tf 1 0 0 1 " % (font, size), b" Tm (%s) Tj ET\n" % _pdf_string(text)
+
 
 class PDFCanvas:
     """Erzeugt Content-Stream-Befehle für eine einzelne PDF-Seite."""
 
     def __init__(self) -> None:
-        self.ops: List[str] = []
+        # Befehle werden direkt als cp1252-Bytes geschrieben, eine Zeile pro Operator
+        self.buf = BytesIO()
 
-    @staticmethod
-    def _escape(text: str) -> str:
-        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
-
-    def _text_width(self, text: str, size: float) -> float:
-        total_units = sum(CHAR_WIDTH_OVERRIDES.get(ch, DEFAULT_CHAR_WIDTH) for ch in text)
-        return (total_units / 1000.0) * size
+    def reset(self) -> None:
+        self.buf.seek(0)
+        self.buf.truncate()
 
     def text(self, x: float, y: float, text: str, size: float = 10, bold: bool = False) -> None:
-        font = "F2" if bold else "F1"
-        safe = self._escape(text)
-        self.ops.append(
-            f"BT /{font} {size:.2f} Tf 1 0 0 1 {x:.2f} {y:.2f} Tm ({safe}) Tj ET"
-        )
+        prefix, suffix = _text_op_parts(text, size, bold)
+        self.buf.write(b"%s%.2f %.2f%s" % (prefix, x, y, suffix))
 
     def text_right(self, x: float, y: float, text: str, size: float = 10, bold: bool = False) -> None:
-        width = self._text_width(text, size)
+        width = _text_width(text, size)
         self.text(x - width, y, text, size=size, bold=bold)
 
     def line(self, x1: float, y1: float, x2: float, y2: float, width: float = 0.5) -> None:
-        self.ops.append(f"{width:.2f} w {x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S")
+        self.buf.write(b"%.2f w %.2f %.2f m %.2f %.2f l S\n" % (width, x1, y1, x2, y2))
+
+
+# Feste Objektnummern der immer gleichen PDF-Grundstruktur
+_CATALOG_ID = 1
+_PAGES_ID = 2
+_FONT_REGULAR_ID = 3
+_FONT_BOLD_ID = 4
+_CATALOG_OBJ = b"<< /Type /Catalog /Pages %d 0 R >>" % _PAGES_ID
+_FONT_REGULAR_OBJ = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+_FONT_BOLD_OBJ = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>"
 
 
 class SimplePDF:
     def __init__(self, width: int = 595, height: int = 842) -> None:
         self.width = width
         self.height = height
-
-    def build(self, canvases: List[PDFCanvas]) -> bytes:
-        from io import BytesIO
-
-        objects: List[List[bytes]] = []
-
-        def add_object(data: bytes = b"") -> int:
-            obj_id = len(objects) + 1
-            objects.append([data])
-            return obj_id
-
-        catalog_id = add_object()
-        pages_id = add_object()
-        font_regular_id = add_object(
-            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
-        )
-        font_bold_id = add_object(
-            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>"
-        )
-
+        # Seitenobjekt bis auf die Content-Referenz vorformatiert
+        self._page_obj_template = (
+            f"<< /Type /Page /Parent {_PAGES_ID} 0 R /MediaBox [0 0 {width} {height}] "
+            f"/Resources << /Font << /F1 {_FONT_REGULAR_ID} 0 R /F2 {_FONT_BOLD_ID} 0 R >> >> "
+            f"/Contents %d 0 R >>"
+        ).encode("ascii")
+
+    def build(self, page_streams: List[bytes]) -> bytes:
+        # Katalog, Seitenbaum (wird unten gefüllt) und beide Schriften
+        objects: List[bytes] = [_CATALOG_OBJ, b"", _FONT_REGULAR_OBJ, _FONT_BOLD_OBJ]
         page_ids: List[int] = []
-        content_ids: List[int] = []
-
-        for canvas in canvases:
-            stream_content = "\n".join(canvas.ops).encode("cp1252", errors="replace")
-            content_bytes = (
-                f"<< /Length {len(stream_content)} >>\nstream\n".encode("ascii")
-                + stream_content
-                + b"\nendstream\n"
+
+        for stream_content in page_streams:
+            objects.append(
+                b"<< /Length %d >>\nstream\n%s\nendstream\n" % (len(stream_content), stream_content)
             )
-            content_id = add_object(content_bytes)
-            content_ids.append(content_id)
-
-            page_id = add_object()
-            page_ids.append(page_id)
-            objects[page_id - 1][0] = (
-                f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox [0 0 {self.width} {self.height}] "
-                f"/Resources << /Font << /F1 {font_regular_id} 0 R /F2 {font_bold_id} 0 R >> >> "
-                f"/Contents {content_id} 0 R >>"
-            ).encode("ascii")
-
-        kids = " ".join(f"{pid} 0 R" for pid in page_ids)
-        objects[pages_id - 1][0] = (
-            f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode("ascii")
-        )
-        objects[catalog_id - 1][0] = f"<< /Type /Catalog /Pages {pages_id} 0 R >>".encode("ascii")
+            objects.append(self._page_obj_template % len(objects))
+            page_ids.append(len(objects))
+
+        kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+        objects[_PAGES_ID - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
 
         output = BytesIO()
         output.write(b"%PDF-1.4\n")
-        offsets = [0]
-        for idx, (data,) in enumerate(objects, start=1):
+        offsets = []
+        for idx, data in enumerate(objects, start=1):
             offsets.append(output.tell())
-            output.write(f"{idx} 0 obj\n".encode("ascii"))
+            output.write(b"%d 0 obj\n" % idx)
             output.write(data)
             if not data.endswith(b"\n"):
                 output.write(b"\n")
             output.write(b"endobj\n")
         xref_offset = output.tell()
-        output.write(f"xref\n0 {len(objects) + 1}\n".encode("ascii"))
-        output.write(b"0000000000 65535 f \n")
-        for off in offsets[1:]:
-            output.write(f"{off:010} 00000 n \n".encode("ascii"))
-        output.write(b"trailer\n")
-        output.write(f"<< /Size {len(objects)+1} /Root {catalog_id} 0 R >>\n".encode("ascii"))
-        output.write(b"startxref\n")
-        output.write(f"{xref_offset}\n".encode("ascii"))
-        output.write(b"%%EOF")
+        output.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        output.write(b"".join([b"%010d 00000 n \n" % off for off in offsets]))
+        output.write(
+            b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF"
+            % (len(objects) + 1, _CATALOG_ID, xref_offset)
+        )
         return output.getvalue()
 
 
@@ -378,9 +446,27 @@ def salutation_for(name: str) -> str:
     return "Frau" if name in FEMALE_NAMES else "Herr"
 
 
+def format_date_de(value: date) -> str:
+    # Direkte Formatierung statt strftime (kein Parsen des Formatstrings)
+    return f"{value.day:02d}.{value.month:02d}.{value.year}"
+
+
+def format_date_compact(value: date) -> str:
+    return f"{value.year}{value.month:02d}{value.day:02d}"
+
+
+# Tausender-/Dezimaltrenner in einem Durchgang tauschen (1,234.56 -> 1.234,56)
+_CURRENCY_TRANS = str.maketrans({",": ".", ".": ","})
+
+
+@lru_cache(maxsize=2048)
 def format_currency(value: float) -> str:
-    s = f"{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    return f"{s} €"
+    return f"{value:,.2f}".translate(_CURRENCY_TRANS) + " €"
+
+
+@lru_cache(maxsize=None)
+def days_in_month(year: int, month: int) -> int:
+    return calendar.monthrange(year, month)[1]
 
 
 def build_month_targets(rng: random.Random) -> Dict[int, int]:
@@ -393,14 +479,15 @@ def generate_person_month_plan(
 ) -> Dict[int, List[str]]:
     month_assignments: Dict[int, List[str]] = {idx: [] for idx, _ in enumerate(MONTHS, start=1)}
     remaining = {idx: month_targets[idx] for idx in month_assignments}
-    person_months: Dict[str, set[int]] = {name: set() for name in FIRST_NAMES}
+    # Zugeteilte Monate pro Person als Bitmaske (Bit i = Monat i)
+    person_months: Dict[str, int] = dict.fromkeys(FIRST_NAMES, 0)
 
     for _ in range(200):
         for idx in month_assignments:
             month_assignments[idx].clear()
             remaining[idx] = month_targets[idx]
         for name in person_months:
-            person_months[name].clear()
+            person_months[name] = 0
 
         try:
             shuffled = FIRST_NAMES[:]
@@ -412,22 +499,20 @@ def generate_person_month_plan(
                 chosen = rng.sample(avail, 2)
                 for month_idx in chosen:
                     month_assignments[month_idx].append(person)
-                    person_months[person].add(month_idx)
+                    person_months[person] |= 1 << month_idx
                     remaining[month_idx] -= 1
 
             months_with_slots = [idx for idx, slots in remaining.items() if slots > 0]
             while months_with_slots:
                 month_idx = rng.choice(months_with_slots)
-                eligible = [
-                    person
-                    for person in FIRST_NAMES
-                    if month_idx not in person_months[person] and len(person_months[person]) < 12
-                ]
+                month_bit = 1 << month_idx
+                # Wer den Monat noch nicht hat, hat zwangsläufig weniger als 12 Monate
+                eligible = [person for person, mask in person_months.items() if not mask & month_bit]
                 if not eligible:
                     raise RuntimeError("Keine verfügbarer Empfänger mehr für Monat." )
                 person = rng.choice(eligible)
                 month_assignments[month_idx].append(person)
-                person_months[person].add(month_idx)
+                person_months[person] |= month_bit
                 remaining[month_idx] -= 1
                 if remaining[month_idx] == 0:
                     months_with_slots.remove(month_idx)
@@ -439,44 +524,50 @@ def generate_person_month_plan(
     raise RuntimeError("Verteilungsplan konnte nicht erzeugt werden.")
 
 
-def pick_items(rng: random.Random, invoice_date: date) -> List[dict]:
-    total_lines = rng.randint(4, 12)
-    med_count = rng.randint(1, total_lines - 1)
-    medications = [rng.choice(MEDICATIONS) for _ in range(med_count)]
-    apo_items = [rng.choice(APO_ARTICLES) for _ in range(total_lines - med_count)]
+def pick_items(rng: random.Random, invoice_date: date) -> List[InvoiceItem]:
+    # Gebundene RNG-Methoden sparen den Attribut-Lookup pro Aufruf; die
+    # Zufallsfolge (und damit die erzeugten Rechnungen) bleibt identisch
+    randint = rng.randint
+    uniform = rng.uniform
+    choice = rng.choice
+
+    total_lines = randint(4, 12)
+    med_count = randint(1, total_lines - 1)
+    medications = [choice(MEDICATIONS) for _ in range(med_count)]
+    apo_items = [choice(APO_ARTICLES) for _ in range(total_lines - med_count)]
     combined = medications + apo_items
     rng.shuffle(combined)
 
+    max_delivery_offset = min(25, invoice_date.day - 1)
     items = []
     for product in combined:
-        qty = rng.randint(1, 3 if product.category == "Medikament" else 4)
-        gross_unit = round(product.base_price + rng.uniform(-1.5, 3.2), 2)
+        qty = randint(1, 3 if product.category == "Medikament" else 4)
+        gross_unit = round(product.base_price + uniform(-1.5, 3.2), 2)
         gross_total = round(gross_unit * qty, 2)
         vat_rate = product.vat_rate
         net_unit = round(gross_unit / (1 + vat_rate / 100), 2)
-        delivery_offset = rng.randint(0, min(25, invoice_date.day - 1 if invoice_date.day > 1 else 0))
-        delivery_date = invoice_date - timedelta(days=delivery_offset)
+        delivery_date = invoice_date - timedelta(days=randint(0, max_delivery_offset))
         items.append(
-            {
-                "delivery_note": f"Lieferschein {rng.randint(2400000, 2499999)} vom {delivery_date.strftime('%d.%m.%Y')}",
-                "name": product.name,
-                "category": product.category,
-                "pzn": f"{rng.randint(10000000, 99999999)}",
-                "pack": rng.choice(PACK_SIZES),
-                "quantity": qty,
-                "price_net": net_unit,
-                "price_gross": gross_unit,
-                "line_total": gross_total,
-                "vat_rate": vat_rate,
-                "delivery_date": delivery_date,
-            }
+            InvoiceItem(
+                delivery_note=f"Lieferschein {randint(2400000, 2499999)} vom {format_date_de(delivery_date)}",
+                name=product.name,
+                category=product.category,
+                pzn=f"{randint(10000000, 99999999)}",
+                pack=choice(PACK_SIZES),
+                quantity=qty,
+                price_net=net_unit,
+                price_gross=gross_unit,
+                line_total=gross_total,
+                vat_rate=vat_rate,
+                delivery_date=delivery_date,
+            )
         )
     return items
 
 
-def paginate_items(items: List[dict]) -> List[List[dict]]:
-    pages: List[List[dict]] = []
-    current: List[dict] = []
+def paginate_items(items: List[InvoiceItem]) -> List[List[InvoiceItem]]:
+    pages: List[List[InvoiceItem]] = []
+    current: List[InvoiceItem] = []
     row_y = ROW_START_Y
     for item in items:
         if current and row_y - ITEM_HEIGHT < MIN_ROW_Y:
@@ -490,13 +581,20 @@ def paginate_items(items: List[dict]) -> List[List[dict]]:
     return pages
 
 
-def compute_totals(items: List[dict]) -> Dict[str, float]:
-    vat_totals = {7: 0.0, 19: 0.0}
-    gross_totals = {7: 0.0, 19: 0.0}
+def compute_totals(items: List[InvoiceItem]) -> Dict[str, float]:
+    # Summen in lokalen Variablen statt Dict-Updates pro Position
+    vat_7 = vat_19 = gross_7 = gross_19 = 0.0
     for item in items:
-        vat_amount = round(item["line_total"] - item["price_net"] * item["quantity"], 2)
-        vat_totals[item["vat_rate"]] += vat_amount
-        gross_totals[item["vat_rate"]] += item["line_total"]
+        line_total = item.line_total
+        vat_amount = round(line_total - item.price_net * item.quantity, 2)
+        if item.vat_rate == 7:
+            vat_7 += vat_amount
+            gross_7 += line_total
+        else:
+            vat_19 += vat_amount
+            gross_19 += line_total
+    vat_totals = {7: vat_7, 19: vat_19}
+    gross_totals = {7: gross_7, 19: gross_19}
     total_vat = round(sum(vat_totals.values()), 2)
     total_gross = round(sum(gross_totals.values()), 2)
     total_net = round(total_gross - total_vat, 2)
@@ -509,7 +607,8 @@ def compute_totals(items: List[dict]) -> Dict[str, float]:
     }
 
 
-def draw_header(canvas: PDFCanvas, data: dict, include_recipient: bool) -> None:
+def draw_header_static(canvas: PDFCanvas) -> None:
+    """Zeichnet alle Kopfelemente, die nicht von der Rechnung abhängen."""
     contact_y = 795
     canvas.text(360, contact_y, "Tel.:", bold=True)
     canvas.text(400, contact_y, "06731-548846")
@@ -524,6 +623,44 @@ def draw_header(canvas: PDFCanvas, data: dict, include_recipient: bool) -> None:
     for idx, line in enumerate(PHARMACY_LINES):
         canvas.text(sender_x, sender_y - idx * sender_gap, line, size=9)
 
+    title_y = y_from_top(TITLE_TOP_MM)
+    canvas.text(sender_x, title_y, "Rechnung", size=20, bold=True)
+
+    info_y_start = y_from_top(INFO_START_MM)
+    for idx, label in enumerate(INFO_FIELDS):
+        canvas.text(360, info_y_start - idx * INFO_LINE_GAP_PT, label, bold=True)
+
+    columns = [
+        ("Menge", column_x("qty"), True),
+        ("Artikelname", column_x("desc"), False),
+        ("PZN", column_x("pzn"), False),
+        ("Pack", column_x("pack"), False),
+        ("Preis", column_x("price"), True),
+        ("VK", column_x("vk"), True),
+        ("Auf/Ab", column_x("adj"), True),
+        ("MwSt", column_x("vat"), True),
+    ]
+    for title, x, align_right in columns:
+        if align_right:
+            canvas.text_right(x, HEADER_Y, title, bold=True)
+        else:
+            canvas.text(x, HEADER_Y, title, bold=True)
+    canvas.line(sender_x, HEADER_Y - 5, CONTENT_RIGHT_X, HEADER_Y - 5)
+
+
+def _render_static_header() -> bytes:
+    canvas = PDFCanvas()
+    draw_header_static(canvas)
+    return canvas.buf.getvalue()
+
+
+# Statischer Seitenkopf, einmal beim Import erzeugt und in jede Seite kopiert
+_STATIC_HEADER_BYTES = _render_static_header()
+
+
+def draw_header_dynamic(canvas: PDFCanvas, data: dict, include_recipient: bool) -> None:
+    """Zeichnet Empfänger, Rechnungsdaten und Zusatzinfos der jeweiligen Rechnung."""
+    sender_x = CONTENT_LEFT_X
     if include_recipient:
         recipient_lines = [
             salutation_for(data["first_name"]),
@@ -538,19 +675,14 @@ def draw_header(canvas: PDFCanvas, data: dict, include_recipient: bool) -> None:
     else:
         canvas.text(sender_x, y_from_top(RECIPIENT_TOP_MM), f"{data['first_name']} Blüm", bold=True)
 
-    title_y = y_from_top(TITLE_TOP_MM)
-    canvas.text(sender_x, title_y, "Rechnung", size=20, bold=True)
-
     info_y_start = y_from_top(INFO_START_MM)
     info_values = [
-        data["invoice_date"].strftime("%d.%m.%Y"),
+        format_date_de(data["invoice_date"]),
         data["customer_id"],
         data["invoice_number"],
     ]
-    for idx, (label, value) in enumerate(zip(INFO_FIELDS, info_values)):
-        y = info_y_start - idx * INFO_LINE_GAP_PT
-        canvas.text(360, y, label, bold=True)
-        canvas.text(450, y, value)
+    for idx, value in enumerate(info_values):
+        canvas.text(450, info_y_start - idx * INFO_LINE_GAP_PT, value)
 
     extra_context = {
         "period_start": data["period_start"],
@@ -563,45 +695,64 @@ def draw_header(canvas: PDFCanvas, data: dict, include_recipient: bool) -> None:
         y = extra_start - idx * ADDITIONAL_INFO_GAP_PT
         canvas.text(sender_x, y, template.format(**extra_context))
 
-    columns = [
-        ("Menge", column_x("qty"), True),
-        ("Artikelname", column_x("desc"), False),
-        ("PZN", column_x("pzn"), False),
-        ("Pack", column_x("pack"), False),
-        ("Preis", column_x("price"), True),
-        ("VK", column_x("vk"), True),
-        ("Auf/Ab", column_x("adj"), True),
-        ("MwSt", column_x("vat"), True),
-    ]
-    for title, x, align_right in columns:
-        if align_right:
-            canvas.text_right(x, HEADER_Y, title, bold=True)
-        else:
-            canvas.text(x, HEADER_Y, title, bold=True)
-    canvas.line(sender_x, HEADER_Y - 5, CONTENT_RIGHT_X, HEADER_Y - 5)
-
 
-def draw_items(canvas: PDFCanvas, items: List[dict]) -> float:
-    qty_x = column_x("qty")
-    desc_x = column_x("desc")
-    pzn_x = column_x("pzn")
-    pack_x = column_x("pack")
-    price_x = column_x("price")
-    vk_x = column_x("vk")
-    adj_x = column_x("adj")
-    vat_x = column_x("vat")
+def draw_header(canvas: PDFCanvas, data: dict, include_recipient: bool) -> None:
+    canvas.buf.write(_STATIC_HEADER_BYTES)
+    draw_header_dynamic(canvas, data, include_recipient)
+
+
+def _row_text_op(font: bytes, x: Optional[float] = None) -> bytes:
+    """Text-Operator (Größe 10) für _ROW_TEMPLATE; ohne x wird es pro Zeile eingesetzt."""
+    x_part = b"%.2f" if x is None else b"%.2f" % x
+    return b"BT /" + font + b" 10.00 Tf 1 0 0 1 " + x_part + b" %.2f Tm (%s) Tj ET\n"
+
+
+# Alle neun Text-Operatoren einer Positionszeile als ein Template: linksbündige
+# Spalten und die konstante Auf/Ab-Spalte haben feste x-Werte, rechtsbündige
+# Werte bekommen x pro Zeile
+_ADJ_TEXT = format_currency(0.0)
+_ROW_TEMPLATE = b"".join([
+    _row_text_op(b"F2", COLUMN_X["desc"]),  # Lieferschein (eine Zeile höher)
+    _row_text_op(b"F1"),  # Menge
+    _row_text_op(b"F1", COLUMN_X["desc"]),  # Artikelname
+    _row_text_op(b"F1", COLUMN_X["pzn"]),
+    _row_text_op(b"F1", COLUMN_X["pack"]),
+    _row_text_op(b"F1"),  # Preis
+    _row_text_op(b"F1"),  # VK
+    _row_text_op(b"F1", COLUMN_X["adj"] - _text_width(_ADJ_TEXT, 10)),  # Auf/Ab
+    _row_text_op(b"F1"),  # MwSt
+])
+
+
+def draw_items(canvas: PDFCanvas, items: List[InvoiceItem]) -> float:
+    qty_x = COLUMN_X["qty"]
+    price_x = COLUMN_X["price"]
+    vk_x = COLUMN_X["vk"]
+    vat_x = COLUMN_X["vat"]
+    adj_text = _pdf_string(_ADJ_TEXT)
+    write = canvas.buf.write
     row_y = ROW_START_Y
     for item in items:
-        canvas.text(desc_x, row_y + 10, item["delivery_note"], bold=True)
+        note_y = row_y + 10
         row_y -= 18
-        canvas.text_right(qty_x, row_y, f"{item['quantity']}")
-        canvas.text(desc_x, row_y, item["name"][:20])
-        canvas.text(pzn_x, row_y, item["pzn"])
-        canvas.text(pack_x, row_y, item["pack"])
-        canvas.text_right(price_x, row_y, format_currency(item["price_net"]))
-        canvas.text_right(vk_x, row_y, format_currency(item["price_gross"]))
-        canvas.text_right(adj_x, row_y, format_currency(0.0))
-        canvas.text_right(vat_x, row_y, f"{item['vat_rate']} %")
+        qty = f"{item.quantity}"
+        price = format_currency(item.price_net)
+        vk = format_currency(item.price_gross)
+        vat = f"{item.vat_rate} %"
+        write(
+            _ROW_TEMPLATE
+            % (
+                note_y, _pdf_string(item.delivery_note),
+                qty_x - _text_width(qty, 10), row_y, _pdf_string(qty),
+                row_y, _pdf_string(item.name[:20]),
+                row_y, _pdf_string(item.pzn),
+                row_y, _pdf_string(item.pack),
+                price_x - _text_width(price, 10), row_y, _pdf_string(price),
+                vk_x - _text_width(vk, 10), row_y, _pdf_string(vk),
+                row_y, adj_text,
+                vat_x - _text_width(vat, 10), row_y, _pdf_string(vat),
+            )
+        )
         row_y -= 22
     canvas.line(CONTENT_LEFT_X, row_y + 10, CONTENT_RIGHT_X, row_y + 10)
     return row_y
@@ -655,6 +806,16 @@ def draw_summary_and_footer(canvas: PDFCanvas, row_y: float, totals: Dict[str, f
     return footer_line_y - 65
 
 
+_thread_state = threading.local()
+
+
+def _reusable_canvas() -> PDFCanvas:
+    canvas = getattr(_thread_state, "canvas", None)
+    if canvas is None:
+        canvas = _thread_state.canvas = PDFCanvas()
+    return canvas
+
+
 def render_invoice(data: dict) -> bytes:
     pages = paginate_items(data["items"])
     if not pages:
@@ -662,11 +823,13 @@ def render_invoice(data: dict) -> bytes:
     totals = compute_totals(data["items"])
     total_pages = len(pages) or 1
 
-    canvases: List[PDFCanvas] = []
+    page_streams: List[bytes] = []
     pdf = SimplePDF()
 
+    # Eine Canvas pro Thread wiederverwenden statt pro Seite neu anzulegen
+    canvas = _reusable_canvas()
     for idx, page_items in enumerate(pages, start=1):
-        canvas = PDFCanvas()
+        canvas.reset()
         draw_header(canvas, data, include_recipient=(idx == 1))
         row_y = draw_items(canvas, page_items)
         if idx == total_pages:
@@ -675,19 +838,31 @@ def render_invoice(data: dict) -> bytes:
             canvas.text(CONTENT_LEFT_X, row_y - 20, "Fortsetzung auf nächster Seite ...")
             page_number_y = 55.0
         canvas.text(CONTENT_LEFT_X, page_number_y, f"Seite {idx} von {total_pages}")
-        canvases.append(canvas)
+        page_streams.append(canvas.buf.getvalue())
 
-    return pdf.build(canvases)
+    return pdf.build(page_streams)
+
+
+def render_invoice_job(job: Tuple[Path, dict]) -> Tuple[Path, bytes]:
+    path, data = job
+    return path, render_invoice(data)
 
 
 def create_invoices() -> None:
+    # Rendern ist reine CPU-Arbeit, daher in eigenen Prozessen (am GIL vorbei)
+    with Pool() as pool:
+        _create_invoices(pool)
+
+
+def _create_invoices(pool: Pool) -> None:
     rng = random.Random(20240602)
     ensure_folder(TARGET_ROOT)
 
     # Pool aller erstellten Rechnungen (werden über Zeit akkumuliert)
     all_invoices = []
     # Pool der aktiven Personen
-    active_people = set(FIRST_NAMES[:10])  # Starten mit 10 Personen
+    active_people = list(FIRST_NAMES[:10])  # Starten mit 10 Personen
+    active_people_set = set(active_people)  # für schnelle Enthaltensein-Prüfung
 
     # Zeitraum: Januar 2024 bis Oktober 2025 (22 Monate)
     start_year, start_month = 2024, 1
@@ -703,17 +878,18 @@ def create_invoices() -> None:
 
         # Neue Rechnungen für diesen Monat erstellen
         num_new_invoices = rng.randint(20, 35)
-        max_day = calendar.monthrange(current_year, current_month)[1]
+        max_day = days_in_month(current_year, current_month)
 
         for i in range(num_new_invoices):
             # Zufällige Person aus dem aktiven Pool
-            first_name = rng.choice(list(active_people))
+            first_name = rng.choice(active_people)
 
             invoice_number = f"S-{current_year}{current_month:02d}-{i+1:04d}"
             invoice_date = date(current_year, current_month, rng.randint(1, max_day))
             items = pick_items(rng, invoice_date)
-            period_start = min(item["delivery_date"] for item in items).strftime("%d.%m.%Y")
-            period_end = max(item["delivery_date"] for item in items).strftime("%d.%m.%Y")
+            delivery_dates = [item.delivery_date for item in items]
+            period_start = format_date_de(min(delivery_dates))
+            period_end = format_date_de(max(delivery_dates))
             customer_id = f"{70000 + hash(first_name) % 10000:05d}"
             note = rng.choice(CLOSING_NOTES)
 
@@ -730,53 +906,36 @@ def create_invoices() -> None:
 
             all_invoices.append(invoice_data)
 
-        # Zahlungssimulation: Entscheiden welche Rechnungen "bezahlt" werden (verschwinden)
-        unpaid_invoices = []
-        for inv in all_invoices:
-            # Berechne Alter der Rechnung in Monaten
-            inv_year, inv_month = inv["invoice_date"].year, inv["invoice_date"].month
-            age_months = (current_year - inv_year) * 12 + (current_month - inv_month)
-
-            # Zahlungswahrscheinlichkeit basierend auf Alter
-            if age_months == 0:
-                # Neue Rechnungen: bleiben alle offen
-                prob_paid = 0.0
-            elif age_months == 1:
-                # Nach 1 Monat: 50% bezahlt
-                prob_paid = 0.50
-            elif age_months == 2:
-                # Nach 2 Monaten: weitere 30% bezahlt
-                prob_paid = 0.30
-            elif age_months == 3:
-                # Nach 3 Monaten: weitere 15% bezahlt
-                prob_paid = 0.15
-            elif age_months <= 6:
-                # Nach 4-6 Monaten: weitere 4% pro Monat bezahlt
-                prob_paid = 0.04
-            else:
-                # Nach 6+ Monaten: nur noch 1% pro Monat bezahlt (chronische Mahnfälle)
-                prob_paid = 0.01
-
-            # Entscheidung: bleibt Rechnung offen?
-            if rng.random() > prob_paid:
-                unpaid_invoices.append(inv)
-
-        all_invoices = unpaid_invoices
+        # Zahlungssimulation: Entscheiden welche Rechnungen "bezahlt" werden (verschwinden).
+        # Zahlungswahrscheinlichkeit per Tabellen-Lookup nach Alter in Monaten;
+        # Rechnung bleibt offen, wenn der Zufallswert darüber liegt
+        current_serial = current_year * 12 + current_month
+        max_age = len(PAID_PROBABILITY_BY_AGE) - 1
+        next_random = rng.random
+        all_invoices = [
+            inv
+            for inv in all_invoices
+            if next_random() > PAID_PROBABILITY_BY_AGE[
+                min(current_serial - (inv["invoice_date"].year * 12 + inv["invoice_date"].month), max_age)
+            ]
+        ]
 
         # Snapshot: Alle offenen Rechnungen in diesen Monatsordner schreiben
+        render_jobs = []
         for inv in all_invoices:
-            pdf_bytes = render_invoice(inv)
-            filename = f"{inv['invoice_date'].strftime('%Y%m%d')}_{inv['invoice_number']}_{inv['first_name']}_Blüm.pdf"
-            (month_dir / filename).write_bytes(pdf_bytes)
+            filename = f"{format_date_compact(inv['invoice_date'])}_{inv['invoice_number']}_{inv['first_name']}_Blüm.pdf"
+            render_jobs.append((month_dir / filename, inv))
+        write_files(list(pool.imap_unordered(render_invoice_job, render_jobs, chunksize=RENDER_CHUNKSIZE)))
 
         print(f"{current_year}-{current_month:02d}_{month_abbr}: {len(all_invoices)} offene Rechnungen ({num_new_invoices} neue)")
 
         # Manchmal neue Personen hinzufügen
         if rng.random() < 0.3 and len(active_people) < len(FIRST_NAMES):
-            available = [n for n in FIRST_NAMES if n not in active_people]
+            available = [n for n in FIRST_NAMES if n not in active_people_set]
             if available:
                 new_person = rng.choice(available)
-                active_people.add(new_person)
+                active_people.append(new_person)
+                active_people_set.add(new_person)
 
         # Nächster Monat
         current_month += 1
@@ -791,6 +950,19 @@ def ensure_folder(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
+def _write_file(job: Tuple[Path, bytes]) -> None:
+    path, data = job
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def write_files(jobs: List[Tuple[Path, bytes]]) -> None:
+    """Schreibt alle Dateien eines Monats; Datei-I/O gibt den GIL frei."""
+    with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as executor:
+        # list() sorgt dafür, dass Fehler beim Schreiben nicht verschluckt werden
+        list(executor.map(_write_file, jobs))
+
+
 def main() -> None:
     create_invoices()
 
@@ -38,6 +38,10 @@ COMPANY_KEYWORDS = (
     "stiftung", "verein", "institut", "gesellschaft", "co.", "kgaa",
 )
 
+# Straße + Hausnummer inkl. Zusatz (12a, 12-14) bzw. PLZ + Ort, einmalig kompiliert
+STREET_RE = re.compile(r"^(.*?)[\s,]+(\d+\s*[a-zA-Z]?(?:\s*[-/]\s*\d+\s*[a-zA-Z]?)?)$")
+CITY_RE = re.compile(r"^(\d{4,5})\s+(.*)$")
+
 
 # --------------------------------------------------------------------------- #
 # Parsing-Helfer
@@ -60,7 +64,7 @@ def split_street(street: str) -> Tuple[str, str]:
     s = (street or "").strip()
     if not s:
         return "", ""
-    m = re.match(r"^(.*?)[\s,]+(\d+\s*[a-zA-Z]?(?:\s*[-/]\s*\d+\s*[a-zA-Z]?)?)$", s)
+    m = STREET_RE.match(s)
     if m:
         return m.group(1).strip(), m.group(2).strip()
     return s, ""
@@ -69,7 +73,7 @@ def split_street(street: str) -> Tuple[str, str]:
 def split_city(city: str) -> Tuple[str, str]:
     """('55232 Alzey') -> ('55232', 'Alzey')."""
     s = (city or "").strip()
-    m = re.match(r"^(\d{4,5})\s+(.*)$", s)
+    m = CITY_RE.match(s)
     if m:
         return m.group(1), m.group(2).strip()
     return "", s
@@ -10,23 +10,35 @@ subsequent runs, only new files are parsed.
 from __future__ import annotations
 
 import argparse
+import bisect
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain, repeat
 import logging
 import re
 import sqlite3
-from dataclasses import dataclass
+import threading
+from dataclasses import dataclass, field
 from datetime import datetime
-from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+import heapq
+import html
+from io import BytesIO
 import time
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Iterable, Iterator, Optional, Tuple
 import os
 import unicodedata
 
 from pypdf import PdfReader
+from pypdf.errors import PyPdfError
 import pdfplumber
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from thefuzz import fuzz
+from rapidfuzz import fuzz as rf_fuzz, process as rf_process
+from rapidfuzz.distance import Levenshtein
 import json
 
 # Load environment variables
@@ -39,9 +51,29 @@ except ImportError:  # pragma: no cover - optional dependency for --watch mode
     FileSystemEventHandler = None
     Observer = None
     PollingObserver = None
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # pragma: no cover - optional faster text extraction
+    pdfium = None
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional faster JSON parsing
+    orjson = None
+try:
+    import gender_guesser.detector as gender_detector
+except ImportError:  # pragma: no cover - optional offline first-name dictionary
+    gender_detector = None
 
 BASE_DIR = Path(__file__).resolve().parent
 
+# PDF_TEXT_ENGINE=pypdf bzw. =pdfium liest den Text mit pypdf bzw. pypdfium2 (um ein
+# Vielfaches schneller). Standard bleibt pdfplumber, auf dessen Textlayout die
+# Adress-Heuristiken abgestimmt sind; scheitert das Parsen mit dem schnellen Text,
+# wird die Datei noch einmal mit pdfplumber gelesen.
+PDF_TEXT_ENGINE = os.getenv("PDF_TEXT_ENGINE", "").lower()
+USE_PDFIUM = pdfium is not None and PDF_TEXT_ENGINE == "pdfium"
+USE_PYPDF = PDF_TEXT_ENGINE == "pypdf"
+
 
 def get_data_dir() -> Path:
     """
@@ -64,6 +96,36 @@ CUSTOMER_MARKERS = {"Herr", "Herrn", "Frau", "Familie"}
 DATE_PATTERN = re.compile(r"(?:Datum:\s*(\d{2}\.\d{2}\.\d{4})|(\d{2}\.\d{2}\.\d{4})\s*Datum:)")
 INVOICE_NO_PATTERN = re.compile(r"(?:Rechnungs-Nr|Deckblatt-Nr):\s*([\w\-\/]+)")
 TOTAL_PATTERN = re.compile(r"(?:Gesamtsumme|Zwischensumme|Rechnungsbetrag).*?([0-9]+(?:\.[0-9]{3})*,[0-9]{2})\s*€")
+TOTAL_KEYWORDS = ("Gesamtsumme", "Zwischensumme", "Rechnungsbetrag")
+# TOTAL_PATTERN without the keyword, matched directly behind it
+TOTAL_AMOUNT_PATTERN = re.compile(r".*?([0-9]+(?:\.[0-9]{3})*,[0-9]{2})\s*€")
+AMOUNT_PATTERN = re.compile(r"([0-9]+(?:\.[0-9]{3})*,[0-9]{2})\s*€")
+DATE_VALUE_PATTERN = re.compile(r"\d{2}\.\d{2}\.\d{4}")
+# Format: "Beleg gespeichert X-Re 'XXXXX' vom 'DD.MM.YYYY' für Name.pdf"
+FILENAME_DATE_PATTERN = re.compile(r"vom\s+'(\d{2}\.\d{2}\.\d{4})'")
+# Monatsordner, z.B. "2024-01-Januar" oder "2024-02"
+SNAPSHOT_FOLDER_PATTERN = re.compile(r"^(\d{4}-\d{2})")
+
+# PDFs per Worker-Auftrag beim parallelen Einlesen in main()
+PARSE_CHUNKSIZE = 16
+# Gleichzeitige Dateilesezugriffe pro Worker in _parse_batch()
+READ_THREADS = 4
+# PDFs pro Schreib-Transaktion in process_pdf_files(). Klein halten: die
+# Fortschrittsanzeige im Web-Scan kommt pro Batch, und andere Schreiber warten
+# höchstens auf einen Batch
+WRITE_BATCH_SIZE = 64
+# Parallele Anfragen beim Ermitteln der Anreden nach dem Scan
+SALUTATION_WORKERS = 8
+# Gleichzeitige Nebius-Batch-Anfragen (je 20 Namen) in den Web-Routen für
+# Anreden und Namensprüfung
+AI_BATCH_WORKERS = 4
+# Höchstens so viele Namen pro Nebius-Anfrage zur Namensprüfung (begrenzt
+# max_tokens und die Antwortzeit einzelner Anfragen)
+AI_NAME_CHUNK = 40
+# Wie oft der Hintergrund-Thread in main() die Anrede-Warteschlange abarbeitet
+SALUTATION_POLL_SECONDS = 5.0
+# Maximale Anzahl Parameter pro "IN (...)"-Abfrage (SQLite-Limit älterer Versionen: 999)
+SQL_IN_CHUNK = 900
 
 
 @dataclass
@@ -105,6 +167,12 @@ def parse_args() -> argparse.Namespace:
         default=0.5,
         help="Delay (in seconds) before reading a freshly created file when --watch is enabled.",
     )
+    parser.add_argument(
+        "--polling",
+        action="store_true",
+        help="Poll the directory instead of using native file system events with --watch "
+             "(needed for network shares that do not report changes).",
+    )
     parser.add_argument(
         "--verbose",
         action="store_true",
@@ -139,7 +207,69 @@ def configure_logging(verbose: bool) -> None:
     root_logger.addHandler(file_handler)
 
 
+# Verbindungs-Einstellungen für open_conn(): WAL statt Rollback-Journal, ohne
+# fsync pro Commit (synchronous=NORMAL ist mit WAL sicher), 64 MB Cache, 256 MB mmap
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+# Wie lange eine Verbindung auf die Schreibsperre wartet, die gerade ein anderer
+# Schreiber hält (Import-Batch, Anrede-Thread, Web-Routen), statt sofort mit
+# "database is locked" abzubrechen. sqlite3 wartet sonst nur 5 s.
+BUSY_TIMEOUT_SECONDS = 30.0
+
+
+def open_conn(db_path: Path, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open a SQLite connection with the tuned pragmas from CONNECTION_PRAGMAS
+    that waits up to BUSY_TIMEOUT_SECONDS for the write lock."""
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=check_same_thread)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> set[str]:
+    """Column names of *table* (empty set if the table does not exist)."""
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_missing_columns(conn: sqlite3.Connection, table: str, column_defs: Iterable[str]) -> None:
+    """ALTER TABLE ... ADD COLUMN for every "name TYPE ..." definition not yet in *table*."""
+    existing = _columns(conn, table)
+    for column_def in column_defs:
+        if column_def.split(None, 1)[0] not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column_def}")
+
+
+def _begin_write(conn: sqlite3.Connection) -> None:
+    """Start a write transaction that takes the write lock right away
+    (commits whatever the caller still had open)."""
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+
+
+# Schema-Version in PRAGMA user_version. Bei jeder neuen Tabelle, Spalte oder
+# jedem neuen Index in init_db erhöhen, damit bestehende DBs einmal migrieren.
+SCHEMA_VERSION = 5
+
+
 def init_db(conn: sqlite3.Connection) -> None:
+    # Schema already up to date: skip all CREATE/ALTER statements
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+
+    # The whole migration runs in one transaction (one commit instead of one
+    # per DDL statement). Re-check the version once we hold the write lock,
+    # another process may have migrated in the meantime.
+    _begin_write(conn)
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        conn.rollback()
+        return
+
     # Create snapshots table
     conn.execute(
         """
@@ -154,10 +284,7 @@ def init_db(conn: sqlite3.Connection) -> None:
     )
 
     # Add import_complete column if it doesn't exist (migration for existing databases)
-    try:
-        conn.execute("ALTER TABLE snapshots ADD COLUMN import_complete INTEGER DEFAULT 0")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
+    _add_missing_columns(conn, "snapshots", ("import_complete INTEGER DEFAULT 0",))
 
     # Create invoices table
     conn.execute(
@@ -231,137 +358,52 @@ def init_db(conn: sqlite3.Connection) -> None:
         """
     )
 
-    # Add salutation column if it doesn't exist (migration for existing databases)
-    try:
-        conn.execute("ALTER TABLE customer_details ADD COLUMN salutation TEXT")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-
-    # Add never_remind column if it doesn't exist (for existing databases)
-    try:
-        conn.execute("ALTER TABLE customer_details ADD COLUMN never_remind INTEGER DEFAULT 0")
-        conn.commit()
-    except sqlite3.OperationalError:
-        # Column already exists, that's fine
-        pass
-
-    # Add bank_debit column if it doesn't exist (for existing databases)
-    try:
-        conn.execute("ALTER TABLE customer_details ADD COLUMN bank_debit INTEGER DEFAULT 0")
-        conn.commit()
-    except sqlite3.OperationalError:
-        # Column already exists, that's fine
-        pass
-
-    # Add print_only column if it doesn't exist (for existing databases)
-    try:
-        conn.execute("ALTER TABLE customer_details ADD COLUMN print_only INTEGER DEFAULT 0")
-        conn.commit()
-    except sqlite3.OperationalError:
-        # Column already exists, that's fine
-        pass
-
-    # Add custom_name column if it doesn't exist (for overriding customer name)
-    try:
-        conn.execute("ALTER TABLE customer_details ADD COLUMN custom_name TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        # Column already exists, that's fine
-        pass
-
-    # Add custom_street column if it doesn't exist (for overriding customer street)
-    try:
-        conn.execute("ALTER TABLE customer_details ADD COLUMN custom_street TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        # Column already exists, that's fine
-        pass
-
-    # Add custom_city column if it doesn't exist (for overriding customer city)
-    try:
-        conn.execute("ALTER TABLE customer_details ADD COLUMN custom_city TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        # Column already exists, that's fine
-        pass
-
-    # Add hide_before_date column if it doesn't exist (for hiding old invoices)
-    try:
-        conn.execute("ALTER TABLE customer_details ADD COLUMN hide_before_date TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        # Column already exists, that's fine
-        pass
-
-    # Add always_rx column if it doesn't exist (for auto-selecting RX in collective invoices)
-    try:
-        conn.execute("ALTER TABLE customer_details ADD COLUMN always_rx INTEGER DEFAULT 0")
-        conn.commit()
-    except sqlite3.OperationalError:
-        # Column already exists, that's fine
-        pass
-
-    # Add uncollectible column to invoices if it doesn't exist (for existing databases)
-    try:
-        conn.execute("ALTER TABLE invoices ADD COLUMN uncollectible INTEGER DEFAULT 0")
-        conn.commit()
-    except sqlite3.OperationalError:
-        # Column already exists, that's fine
-        pass
-
-    # Add customer_street and customer_city columns to invoices if they don't exist
-    try:
-        conn.execute("ALTER TABLE invoices ADD COLUMN customer_street TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-
-    try:
-        conn.execute("ALTER TABLE invoices ADD COLUMN customer_city TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass  # Column already exists
+    # Add columns missing in existing databases (only the missing ones are altered)
+    _add_missing_columns(conn, "customer_details", (
+        "salutation TEXT",
+        "never_remind INTEGER DEFAULT 0",
+        "bank_debit INTEGER DEFAULT 0",
+        "print_only INTEGER DEFAULT 0",
+        "custom_name TEXT",                  # overrides the customer name
+        "custom_street TEXT",                # overrides the customer street
+        "custom_city TEXT",                  # overrides the customer city
+        "hide_before_date TEXT",             # hides old invoices
+        "always_rx INTEGER DEFAULT 0",       # auto-selects RX in collective invoices
+    ))
+
+    _add_missing_columns(conn, "invoices", (
+        "uncollectible INTEGER DEFAULT 0",
+        "customer_street TEXT",
+        "customer_city TEXT",
+        "name_needs_review INTEGER DEFAULT 0",
+        # auto_mapped: set when an import was auto-resolved via a saved import_mapping
+        # and is awaiting the user's one-time confirmation in the review list.
+        "auto_mapped INTEGER DEFAULT 0",
+        # mapped_from: the originally parsed name of an auto-mapped import (so the
+        # review list can show "<parsed> -> <assigned customer>").
+        "mapped_from TEXT",
+    ))
 
     # Migrate existing customer_address data to customer_street and customer_city
-    # Only migrate rows where customer_street is NULL (not yet migrated)
-    conn.execute("""
-        UPDATE invoices
-        SET
-            customer_street = CASE
-                WHEN customer_address LIKE '%,%'
-                THEN TRIM(SUBSTR(customer_address, 1, INSTR(customer_address, ',') - 1))
-                ELSE customer_address
-            END,
-            customer_city = CASE
-                WHEN customer_address LIKE '%,%'
-                THEN TRIM(SUBSTR(customer_address, INSTR(customer_address, ',') + 1))
-                ELSE ''
-            END
-        WHERE customer_street IS NULL
-    """)
-
-    # Add name_needs_review column to invoices if it doesn't exist (for existing databases)
-    try:
-        conn.execute("ALTER TABLE invoices ADD COLUMN name_needs_review INTEGER DEFAULT 0")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-
-    # auto_mapped: set when an import was auto-resolved via a saved import_mapping
-    # and is awaiting the user's one-time confirmation in the review list.
-    try:
-        conn.execute("ALTER TABLE invoices ADD COLUMN auto_mapped INTEGER DEFAULT 0")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass  # Column already exists
+    # Only migrate rows where customer_street is NULL (not yet migrated). Split in
+    # Python instead of per-row SUBSTR/INSTR/TRIM in SQL; TRIM strips spaces only.
+    updates = []
+    for invoice_id, address in conn.execute(
+        "SELECT id, customer_address FROM invoices WHERE customer_street IS NULL"
+    ).fetchall():
+        if address is not None and "," in address:
+            street, city = (part.strip(" ") for part in address.split(",", 1))
+        else:
+            street, city = address, ""
+        updates.append((street, city, invoice_id))
+    conn.executemany(
+        "UPDATE invoices SET customer_street = ?, customer_city = ? WHERE id = ?",
+        updates,
+    )
 
-    # mapped_from: the originally parsed name of an auto-mapped import (so the
-    # review list can show "<parsed> -> <assigned customer>").
-    try:
-        conn.execute("ALTER TABLE invoices ADD COLUMN mapped_from TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass  # Column already exists
+    # file_mtime/file_size: signature of the linked PDF, so rescans can skip
+    # unchanged files without opening them.
+    _add_missing_columns(conn, "invoice_snapshots", ("file_mtime INTEGER", "file_size INTEGER"))
 
     # Create sammelrechnungen_letterxpress table for tracking Letterxpress submissions
     conn.execute(
@@ -398,18 +440,14 @@ def init_db(conn: sqlite3.Connection) -> None:
     )
 
     # Einschreiben-Tracking-Spalten (Migration für bestehende DBs)
-    for col_def in (
+    _add_missing_columns(conn, "mahnungen_letterxpress", (
         "registered TEXT",           # r1/r2 (Einschreiben) oder NULL
         "dispatch_date TEXT",        # Versanddatum laut LetterXpress
         "tracking_code TEXT",        # Deutsche-Post-Sendungsnummer
         "tracking_status TEXT",      # Klartext-Zustellstatus
         "item_status TEXT",          # Status des Einzel-Items (sent/...)
         "last_tracking_check TEXT",  # Zeitpunkt der letzten API-Abfrage
-    ):
-        try:
-            conn.execute(f"ALTER TABLE mahnungen_letterxpress ADD COLUMN {col_def}")
-        except sqlite3.OperationalError:
-            pass  # Spalte existiert bereits
+    ))
 
     # Create collective_invoice_items table to track which invoices are in which collective invoices
     conn.execute(
@@ -477,6 +515,39 @@ def init_db(conn: sqlite3.Connection) -> None:
         """
     )
 
+    # Create pending_salutations table: customers whose salutation still has to be
+    # determined via AI (drained outside the import path, see drain_pending_salutations)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pending_salutations (
+            customer_name TEXT PRIMARY KEY,
+            created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+        )
+        """
+    )
+
+    # AI answer caches: repeated imports mostly see recurring first names and
+    # customers, a cache hit saves the Nebius request. Only real answers are
+    # stored (gender: Herr/Frau), failed lookups are asked again.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ai_gender_cache (
+            first_name TEXT PRIMARY KEY,  -- lowercase
+            salutation TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ai_name_validity_cache (
+            customer_name TEXT PRIMARY KEY,
+            valid INTEGER NOT NULL,
+            created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+        )
+        """
+    )
+
     # Create import_mappings table: remembers how a parsed (name/street/city) was
     # resolved, so future identical imports are auto-assigned without re-asking.
     conn.execute(
@@ -520,8 +591,43 @@ def init_db(conn: sqlite3.Connection) -> None:
             """
         )
 
+    # Indexes for the hot lookups. (invoice_number, customer_name, amount_cents)
+    # and (invoice_id, snapshot_id) are already covered by their UNIQUE constraints.
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_invoice_snapshots_snapshot "
+        "ON invoice_snapshots(snapshot_id, invoice_id)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_invoice_history_invoice_event "
+        "ON invoice_history(invoice_id, event_type)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_invoice_snapshots_file_path "
+        "ON invoice_snapshots(file_path)"
+    )
+    # Customer lookups (persist's exact-match check, customer pages) and the
+    # reminder FK: neither is covered by a UNIQUE constraint, so without these
+    # every lookup and every ON DELETE CASCADE scans the whole table.
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_invoices_customer "
+        "ON invoices(customer_name, customer_street, customer_city)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_reminders_invoice "
+        "ON reminders(invoice_id, created_at)"
+    )
+    # Partial index covering get_completed_folders (only the completed folders)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_snapshots_complete "
+        "ON snapshots(import_complete, folder_name) WHERE import_complete = 1"
+    )
+
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
     conn.commit()
 
+    # Refresh planner statistics; cheap no-op unless tables changed noticeably
+    conn.execute("PRAGMA optimize")
+
 
 def extract_snapshot_from_path(pdf_path: Path, root: Path) -> Optional[tuple[str, str]]:
     """
@@ -532,28 +638,89 @@ def extract_snapshot_from_path(pdf_path: Path, root: Path) -> Optional[tuple[str
       Rechnungen/2024-01-Januar/invoice.pdf -> ("2024-01", "2024-01-Januar")
       Rechnungen/2024-02/invoice.pdf -> ("2024-02", "2024-02")
     """
-    try:
-        relative_path = pdf_path.relative_to(root)
-        parts = relative_path.parts
+    relative = _relative_to(pdf_path, root)
+    if relative is None:
+        return None
 
-        if len(parts) < 2:
-            return None
+    folder_name, sep, _ = relative.partition(os.sep)
+    if not sep:
+        return None  # File directly in root
 
-        folder_name = parts[0]
+    # Try to extract YYYY-MM pattern from folder name
+    match = SNAPSHOT_FOLDER_PATTERN.match(folder_name)
+    if match:
+        snapshot_date = match.group(1)
+        return (snapshot_date, folder_name)
 
-        # Try to extract YYYY-MM pattern from folder name
-        match = re.match(r'^(\d{4}-\d{2})', folder_name)
-        if match:
-            snapshot_date = match.group(1)
-            return (snapshot_date, folder_name)
+    return None
 
-        return None
-    except (ValueError, IndexError):
+
+def _relative_to(pdf_path: Path, base: Path) -> Optional[str]:
+    """
+    str(pdf_path.relative_to(base)), or None if pdf_path is not below base.
+    Paths found by walking *base* start with its exact spelling, so a string
+    prefix check suffices; pathlib is only used for the remaining cases.
+    """
+    path_str = str(pdf_path)
+    base_str = str(base)
+    prefix = base_str if base_str.endswith(os.sep) else base_str + os.sep
+    if len(path_str) > len(prefix) and path_str.startswith(prefix):
+        return path_str[len(prefix):]
+    try:
+        return str(pdf_path.relative_to(base))
+    except ValueError:
         return None
 
 
-def find_pdfs(root: Path) -> Iterable[Path]:
-    return sorted(path for path in root.rglob("*.pdf") if path.is_file())
+def _walk_pdfs(directory: str) -> Iterator[os.DirEntry]:
+    """Recursively yield the directory entries of all PDF files below *directory*.
+    Uses os.scandir, whose entries already know their type, so no extra stat per file."""
+    try:
+        entries = list(os.scandir(directory))
+    except OSError as exc:
+        logging.warning("Kann Ordner %s nicht lesen: %s", directory, exc)
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from _walk_pdfs(entry.path)
+        elif entry.name.lower().endswith(".pdf") and entry.is_file():
+            yield entry
+
+
+def find_pdfs(root: Path, sort: bool = False) -> Iterator[Path]:
+    """Yield all PDFs below *root* while the tree is walked (directory order).
+    With sort=True the whole tree is listed first and returned sorted."""
+    paths = (Path(entry.path) for entry in _walk_pdfs(str(root)))
+    return iter(sorted(paths)) if sort else paths
+
+
+def find_pdfs_with_signature(root: Path) -> list[tuple[Path, tuple[int, int]]]:
+    """Like find_pdfs, but also return each file's (mtime, size) signature."""
+    return sorted(
+        (Path(entry.path), _stat_signature(entry.stat()))
+        for entry in _walk_pdfs(str(root))
+    )
+
+
+def _stat_signature(stat_result: os.stat_result) -> tuple[int, int]:
+    return stat_result.st_mtime_ns // 1_000_000_000, stat_result.st_size
+
+
+def _is_unchanged(stored: Optional[tuple], signature: tuple[int, int]) -> bool:
+    """True if a linked file still has its stored signature. Links from before the
+    signature columns existed (NULL) count as unchanged."""
+    return stored[0] is None or tuple(stored) == signature
+
+
+def store_file_signatures(
+    conn: sqlite3.Connection,
+    signatures: Iterable[tuple[str, tuple[int, int]]]
+) -> None:
+    """Remember (mtime, size) for the invoice_snapshots rows of the given file paths."""
+    conn.executemany(
+        "UPDATE invoice_snapshots SET file_mtime = ?, file_size = ? WHERE file_path = ?",
+        [(mtime, size, key) for key, (mtime, size) in signatures]
+    )
 
 
 def get_completed_folders(conn: sqlite3.Connection) -> set[str]:
@@ -561,7 +728,7 @@ def get_completed_folders(conn: sqlite3.Connection) -> set[str]:
     cursor = conn.execute(
         "SELECT folder_name FROM snapshots WHERE import_complete = 1"
     )
-    return {row[0] for row in cursor.fetchall()}
+    return {row[0] for row in cursor}
 
 
 def find_pdfs_for_import(root: Path, conn: sqlite3.Connection) -> Iterable[Path]:
@@ -578,21 +745,19 @@ def find_pdfs_for_import(root: Path, conn: sqlite3.Connection) -> Iterable[Path]
             ", ".join(sorted(completed_folders))
         )
 
-    for path in sorted(root.rglob("*.pdf")):
-        if not path.is_file():
-            continue
-
-        # Get the folder name (first part of relative path)
-        try:
-            relative_path = path.relative_to(root)
-            if len(relative_path.parts) >= 1:
-                folder_name = relative_path.parts[0]
-                if folder_name in completed_folders:
-                    continue  # Skip files in completed folders
-        except ValueError:
-            pass
-
-        yield path
+    # Completed folders are pruned before descending, their files are never
+    # listed. Sorting per top-level entry gives the same order as sorting all.
+    try:
+        top_entries = sorted(os.scandir(root), key=lambda entry: Path(entry.path))
+    except OSError as exc:
+        logging.warning("Kann Ordner %s nicht lesen: %s", root, exc)
+        return
+    for entry in top_entries:
+        if entry.is_dir(follow_symlinks=False):
+            if entry.name not in completed_folders:
+                yield from sorted(Path(pdf.path) for pdf in _walk_pdfs(entry.path))
+        elif entry.name.lower().endswith(".pdf") and entry.is_file():
+            yield Path(entry.path)
 
 
 def mark_folder_complete(conn: sqlite3.Connection, folder_name: str) -> bool:
@@ -618,10 +783,53 @@ def mark_folder_incomplete(conn: sqlite3.Connection, folder_name: str) -> bool:
     return cursor.rowcount > 0
 
 
-def extract_text(pdf_path: Path) -> str:
-    """Extract text from PDF using pdfplumber for better structure recognition."""
-    with pdfplumber.open(pdf_path) as pdf:
-        return "\n".join(page.extract_text() or "" for page in pdf.pages)
+def iter_pages(pdf_path: Path, data: Optional[bytes] = None) -> Iterator[str]:
+    """Yield the text of each PDF page using pdfplumber for better structure recognition
+    (or pypdf/pypdfium2 if enabled via PDF_TEXT_ENGINE, falling back to pdfplumber).
+    If the file content was already read, pass it as *data*."""
+    if USE_PYPDF:
+        try:
+            # strict=False: kleinere Formfehler (xref-Offsets etc.) nur loggen statt abbrechen
+            reader = PdfReader(BytesIO(data) if data is not None else pdf_path, strict=False)
+            pages = reader.pages
+        except PyPdfError as exc:
+            logging.debug("pypdf kann %s nicht lesen (%s) - nutze pdfplumber", pdf_path, exc)
+        else:
+            for page in pages:
+                yield page.extract_text() or ""
+            return
+
+    if USE_PDFIUM:
+        try:
+            document = pdfium.PdfDocument(data if data is not None else str(pdf_path))
+        except pdfium.PdfiumError as exc:
+            logging.debug("pypdfium2 kann %s nicht lesen (%s) - nutze pdfplumber", pdf_path, exc)
+        else:
+            try:
+                for page in document:
+                    yield page.get_textpage().get_text_range().replace("\r\n", "\n")
+            finally:
+                document.close()
+            return
+
+    yield from _iter_pages_fallback(pdf_path, data)
+
+
+def _iter_pages_fallback(pdf_path: Path, data: Optional[bytes] = None) -> Iterator[str]:
+    """Page texts via pdfplumber (slow, but the layout the heuristics are tuned to)."""
+    with pdfplumber.open(BytesIO(data) if data is not None else pdf_path) as pdf:
+        for page in pdf.pages:
+            yield page.extract_text() or ""
+
+
+# Keywords that indicate a cancellation document (case-insensitive, one search)
+STORNO_KEYWORDS = (
+    "Stornobeleg für",
+    "Stornierung für",
+    "Stornodatum:",
+    "Stornogrund:",
+)
+_STORNO_RE = re.compile("|".join(map(re.escape, STORNO_KEYWORDS)), re.IGNORECASE)
 
 
 def is_storno_document(text: str) -> bool:
@@ -629,21 +837,7 @@ def is_storno_document(text: str) -> bool:
     Check if the document is a Stornobeleg (cancellation document).
     Returns True if it's a cancellation, False if it's a regular invoice.
     """
-    # Keywords that indicate a cancellation document
-    storno_keywords = [
-        "Stornobeleg für",
-        "Stornierung für",
-        "Stornodatum:",
-        "Stornogrund:",
-    ]
-
-    text_lower = text.lower()
-
-    for keyword in storno_keywords:
-        if keyword.lower() in text_lower:
-            return True
-
-    return False
+    return _STORNO_RE.search(text) is not None
 
 
 # Salutation tokens that anchor the recipient name: the real name is always the
@@ -662,14 +856,29 @@ _PLZ_RE = re.compile(r"^\d{5}\b")
 # The sender's inline return address, e.g. "Apotheke am Damm, Am Damm 17, 55232 Alzey".
 # It marks where the recipient address block begins (right after it).
 _INLINE_ADDRESS_RE = re.compile(r",\s*\d{5}\s+\S")
+# "Herr Dr.", "Frau Dr. med.", "Herr und Frau", "Frau u. Herr" etc. (on lowercased text)
+_TITLED_SALUTATION_RE = re.compile(r"^(herr|frau)\b.*\b(dr|frau|herr)\b")
+_SALUTATION_WORDS = frozenset(t.rstrip(".") for t in SALUTATION_TOKENS)
+_WORD_RE = re.compile(r"\w+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Fallback heuristics of extract_customer: lines that can't be the customer name
+_ADDRESS_SKIP_KEYWORDS = ("Datum:", "DECKBLATT", "Tel", "Fax", "Rechnung", "Kunden-Nr", "Apotheke am Damm")
+_ADDRESS_SKIP_RE = re.compile("|".join(map(re.escape, _ADDRESS_SKIP_KEYWORDS)))
+# ...for the street-only (incomplete) address also our own address and medication lists
+_STREET_ONLY_SKIP_RE = re.compile(
+    "|".join(map(re.escape, _ADDRESS_SKIP_KEYWORDS + ("Medikation", "Am Damm")))
+)
+_STREET_PREFIXES = ("Am ", "An ", "Auf ", "In ", "Zur ", "Zum ")
+_TABLE_WORDS_RE = re.compile("Menge|PZN|Artikel|Pack|MwSt|Netto|Summe")
 
 
 def _is_salutation(line: str) -> bool:
-    token = line.strip().lower().rstrip(".")
-    if token in {t.rstrip(".") for t in SALUTATION_TOKENS}:
+    lowered = line.lower()
+    if lowered.rstrip(".") in _SALUTATION_WORDS:
         return True
     # "Herr Dr.", "Frau Dr. med.", "Herr und Frau", "Frau u. Herr" etc.
-    return bool(re.match(r"^(herr|frau)\b.*\b(dr|frau|herr)\b", line.strip().lower()))
+    return bool(_TITLED_SALUTATION_RE.match(lowered))
 
 
 def _has_digit(text: str) -> bool:
@@ -679,7 +888,7 @@ def _has_digit(text: str) -> bool:
 def _is_ortsteil(line: str, city_words: set[str]) -> bool:
     """True if every word of *line* also appears in the city - i.e. the line is an
     "Ortsteil" that merely repeats the city (the 4-line-address trap), not a name."""
-    words = re.findall(r"\w+", line.lower())
+    words = _WORD_RE.findall(line.lower())
     return bool(words) and all(w in city_words for w in words)
 
 
@@ -733,15 +942,15 @@ def _parse_recipient_block(block: list[str]) -> tuple[str, str, str, bool] | Non
                 street_idx = i
                 break
         if street_idx is not None and street_idx >= 1:
-            city = re.sub(r"\s+", " ", block[plz_idx]).strip()
-            street = block[street_idx].strip()
+            city = _WHITESPACE_RE.sub(" ", block[plz_idx])
+            street = block[street_idx]
             # Walk up from the street, skipping "Ortsteil" lines that merely repeat
             # the city (the 4-line-address trap), to find the real name.
-            city_words = set(re.findall(r"\w+", city.lower()))
+            city_words = set(_WORD_RE.findall(city.lower()))
             name_idx = street_idx - 1
             while name_idx > 0 and _is_ortsteil(block[name_idx], city_words):
                 name_idx -= 1
-            name = block[name_idx].strip()
+            name = block[name_idx]
             # A bare salutation is not a name -> let the salutation fallback try.
             if name and not _is_salutation(name) and not _is_ortsteil(name, city_words):
                 return name, street, city, False
@@ -749,15 +958,15 @@ def _parse_recipient_block(block: list[str]) -> tuple[str, str, str, bool] | Non
     # --- Fallback: no usable PLZ -> anchor on the salutation (Herr/Frau/...) ---
     # Handles "Herr / Name / Ort / Straße" where the PDF omits the postal code.
     if block and _is_salutation(block[0]) and len(block) >= 2:
-        name = block[1].strip()
+        name = block[1]
         rest = block[2:]
         street_idx = None
         for i in range(len(rest) - 1, -1, -1):
             if _has_digit(rest[i]):
                 street_idx = i
                 break
-        street = rest[street_idx].strip() if street_idx is not None else ""
-        others = [rest[i].strip() for i in range(len(rest)) if i != street_idx]
+        street = rest[street_idx] if street_idx is not None else ""
+        others = [rest[i] for i in range(len(rest)) if i != street_idx]
         city = others[0] if others else ""
         if name and street and not _is_salutation(name):
             # Incomplete: no proper PLZ in the PDF (never fabricate a default city).
@@ -766,9 +975,39 @@ def _parse_recipient_block(block: list[str]) -> tuple[str, str, str, bool] | Non
     return None
 
 
+def _is_street_only_address(lines: list[str], idx: int) -> bool:
+    """True if lines[idx] looks like a customer name followed by a street, but
+    without a PLZ + Stadt line (incomplete address). Needs idx + 1 < len(lines)."""
+    name = lines[idx]
+    addr_line1 = lines[idx + 1]
+    addr_line2 = lines[idx + 2] if idx + 2 < len(lines) else ""
+
+    if _STREET_ONLY_SKIP_RE.search(name) or _STREET_ONLY_SKIP_RE.search(addr_line1):
+        return False
+
+    # Skip if name looks like a street (e.g., "Am Damm 17")
+    # Street names typically start with prepositions or have numbers
+    if name.startswith(_STREET_PREFIXES) or _has_digit(name):
+        return False
+
+    # Check if this looks like a street address (contains letters and numbers)
+    # and the name doesn't look like metadata
+    return bool(
+        name and len(name) > 3 and addr_line1 and
+        # Street should have at least one letter and possibly a number
+        any(c.isalpha() for c in addr_line1) and
+        # But addr_line2 either doesn't exist or doesn't start with PLZ
+        (not addr_line2 or (len(addr_line2) < 5 or not addr_line2[:5].isdigit())) and
+        # Name should look like a person or business name, not like "Menge PZN"
+        not _TABLE_WORDS_RE.search(name)
+    )
+
+
 def extract_customer(lines: list[str]) -> tuple[str, str, str, bool]:
     """Extract customer name, street, and city separately from invoice lines.
 
+    *lines* must already be stripped and non-empty (see parse_invoice).
+
     Returns:
         tuple[str, str, str, bool]: (customer_name, customer_street, customer_city, address_incomplete)
     """
@@ -786,105 +1025,89 @@ def extract_customer(lines: list[str]) -> tuple[str, str, str, bool]:
         return name, street, city, incomplete
 
     # ---- Fallback heuristics for PDFs whose layout we don't recognise ----
-    # Try to find customer info by looking for address pattern with name followed by street and city
-    # Format: Name, Street + Number, PLZ + City
-    for idx in range(len(lines) - 2):
-        name = lines[idx].strip()
-        addr_line1 = lines[idx + 1].strip()
-        addr_line2 = lines[idx + 2].strip() if idx + 2 < len(lines) else ""
-
-        # Skip sender address and metadata lines
-        skip_keywords = ["Datum:", "DECKBLATT", "Tel", "Fax", "Rechnung", "Kunden-Nr"]
-        if any(keyword in name for keyword in skip_keywords):
-            continue
+    # One pass over the lines. In order of preference:
+    #   1. Name, Street + Number, PLZ + City (first match wins, also B2B
+    #      recipients like Apotheke/Praxis - only our own address is skipped)
+    #   2. first incomplete address (only street, missing PLZ+Stadt)
+    #   3. the line after a marker (Herr/Frau/...)
+    street_only = None
+    marker_idxs = []
+    for idx, line in enumerate(lines):
+        if idx >= 2 and len(line) >= 5 and line[:5].isdigit():
+            name = lines[idx - 2]
+            if name and not _ADDRESS_SKIP_RE.search(name):
+                return name, lines[idx - 1], line, False  # Complete address
+
+        if street_only is None:
+            if idx + 1 < len(lines) and _is_street_only_address(lines, idx):
+                street_only = idx
+            elif line in CUSTOMER_MARKERS:
+                marker_idxs.append(idx)
+
+    if street_only is not None:
+        name, addr_line1 = lines[street_only], lines[street_only + 1]
+        logging.warning(f"⚠️ Unvollständige Adresse für '{name}' (nur Straße '{addr_line1}') - keine PLZ/Ort im PDF")
+        return name, addr_line1, "", True  # Incomplete address - never fabricate a city!
 
-        # Check if this looks like a valid address with PLZ + Stadt
-        if (addr_line2 and len(addr_line2) >= 5 and addr_line2[:5].isdigit()
-            and name and "Apotheke am Damm" not in name):
-            street = addr_line1
-            city = addr_line2
-            return name, street, city, False  # Complete address
-
-    # Second pass: Look for addresses WITHOUT "Apotheke am Damm" restriction
-    # This handles B2B invoices (Apotheke, Praxis, etc.)
-    for idx in range(len(lines) - 2):
-        name = lines[idx].strip()
-        addr_line1 = lines[idx + 1].strip()
-        addr_line2 = lines[idx + 2].strip() if idx + 2 < len(lines) else ""
-
-        skip_keywords = ["Datum:", "DECKBLATT", "Tel", "Fax", "Rechnung", "Kunden-Nr", "Apotheke am Damm"]
-        if any(keyword in name for keyword in skip_keywords):
-            continue
+    # Fallback: try old method with markers
+    for idx in marker_idxs:
+        try:
+            name = lines[idx + 1]
+            # Skip if next line looks like a date
+            if "Datum:" in name or DATE_VALUE_PATTERN.match(name):
+                continue
+            addr_line1 = lines[idx + 2]
+            addr_line2 = lines[idx + 3] if idx + 3 < len(lines) else ""
+        except IndexError as exc:
+            raise ValueError("Unvollständige Adresse im PDF") from exc
+        if not name or not addr_line1:
+            raise ValueError("Adresse enthält leere Zeilen")
+
+        # If addr_line2 is missing or incomplete, mark incomplete (never fabricate a city)
+        address_incomplete = False
+        if not addr_line2 or (len(addr_line2) >= 5 and not addr_line2[:5].isdigit()):
+            logging.warning(f"⚠️ Unvollständige Adresse für '{name}' - keine PLZ/Ort im PDF")
+            if not addr_line2 or not addr_line2[:5].isdigit():
+                addr_line2 = ""
+            address_incomplete = True
+
+        street = addr_line1
+        city = addr_line2
+        return name, street, city, address_incomplete
+    raise ValueError("Keine Empfängeradresse gefunden")
 
-        # Valid address with PLZ + Stadt
-        if addr_line2 and len(addr_line2) >= 5 and addr_line2[:5].isdigit() and name:
-            street = addr_line1
-            city = addr_line2
-            return name, street, city, False  # Complete address (B2B)
-
-    # Third pass: Look for incomplete addresses (only street, missing PLZ+Stadt)
-    # This is more restrictive - only matches if the pattern really looks like a customer address
-    for idx in range(len(lines) - 1):
-        name = lines[idx].strip()
-        addr_line1 = lines[idx + 1].strip()
-        addr_line2 = lines[idx + 2].strip() if idx + 2 < len(lines) else ""
-
-        skip_keywords = ["Datum:", "DECKBLATT", "Tel", "Fax", "Rechnung", "Kunden-Nr", "Apotheke am Damm", "Medikation", "Am Damm"]
-        if any(keyword in name for keyword in skip_keywords):
-            continue
 
-        # Skip if addr_line1 looks like sender address
-        if any(keyword in addr_line1 for keyword in skip_keywords):
-            continue
+def _search_total(text: str) -> Optional[re.Match]:
+    """
+    Same result as TOTAL_PATTERN.search(text), but the keyword is located with
+    str.find and the regex only runs on the rest of that line.
+    """
+    start = -1
+    keyword = ""
+    for candidate in TOTAL_KEYWORDS:
+        pos = text.find(candidate)
+        if pos >= 0 and (start < 0 or pos < start):
+            start, keyword = pos, candidate
+    if start < 0:
+        return None
+    match = TOTAL_AMOUNT_PATTERN.match(text, start + len(keyword))
+    if match:
+        return match
+    # No amount on the first keyword line -> let the full pattern look further
+    return TOTAL_PATTERN.search(text, start + 1)
 
-        # Additional check: Skip if name looks like a street (e.g., "Am Damm 17")
-        # Street names typically start with prepositions or have numbers
-        if (name.startswith(("Am ", "An ", "Auf ", "In ", "Zur ", "Zum ")) or
-            any(c.isdigit() for c in name)):
-            continue
 
-        # Check if this looks like a street address (contains letters and numbers)
-        # and the name doesn't look like metadata
-        if (name and len(name) > 3 and addr_line1 and
-            # Street should have at least one letter and possibly a number
-            any(c.isalpha() for c in addr_line1) and
-            # But addr_line2 either doesn't exist or doesn't start with PLZ
-            (not addr_line2 or (len(addr_line2) < 5 or not addr_line2[:5].isdigit()))):
+# Tausender- und Dezimaltrennzeichen in einem Durchlauf entfernen
+_AMOUNT_SEPARATORS = str.maketrans("", "", ".,")
 
-            # Additional check: name should look like a person or business name
-            # Avoid matching random text like "Menge PZN" etc.
-            if not any(kw in name for kw in ["Menge", "PZN", "Artikel", "Pack", "MwSt", "Netto", "Summe"]):
-                logging.warning(f"⚠️ Unvollständige Adresse für '{name}' (nur Straße '{addr_line1}') - keine PLZ/Ort im PDF")
-                return name, addr_line1, "", True  # Incomplete address - never fabricate a city!
 
-    # Fallback: try old method with markers
-    for idx, raw in enumerate(lines):
-        token = raw.strip()
-        if token in CUSTOMER_MARKERS:
-            try:
-                name = lines[idx + 1].strip()
-                # Skip if next line looks like a date
-                if "Datum:" in name or re.match(r'\d{2}\.\d{2}\.\d{4}', name):
-                    continue
-                addr_line1 = lines[idx + 2].strip()
-                addr_line2 = lines[idx + 3].strip() if idx + 3 < len(lines) else ""
-            except IndexError as exc:
-                raise ValueError("Unvollständige Adresse im PDF") from exc
-            if not name or not addr_line1:
-                raise ValueError("Adresse enthält leere Zeilen")
-
-            # If addr_line2 is missing or incomplete, mark incomplete (never fabricate a city)
-            address_incomplete = False
-            if not addr_line2 or (len(addr_line2) >= 5 and not addr_line2[:5].isdigit()):
-                logging.warning(f"⚠️ Unvollständige Adresse für '{name}' - keine PLZ/Ort im PDF")
-                if not addr_line2 or not addr_line2[:5].isdigit():
-                    addr_line2 = ""
-                address_incomplete = True
-
-            street = addr_line1
-            city = addr_line2
-            return name, street, city, address_incomplete
-    raise ValueError("Keine Empfängeradresse gefunden")
+def _amount_to_cents(amount_raw: str) -> int:
+    """Convert a German amount like "1.234,56" to cents. The amount patterns
+    always capture exactly two decimals, so dropping the separators is enough."""
+    try:
+        return int(amount_raw.translate(_AMOUNT_SEPARATORS))
+    except ValueError as exc:
+        raise ValueError("Ungültiger Rechnungsbetrag") from exc
 
 
 def extract_total_amount_robust(text: str) -> int:
@@ -893,48 +1116,75 @@ def extract_total_amount_robust(text: str) -> int:
     Tries the old inline pattern first, then table format.
     """
     # Try the old pattern first
-    total_match = TOTAL_PATTERN.search(text)
+    total_match = _search_total(text)
     if total_match:
-        amount_raw = total_match.group(1).replace(".", "").replace(",", ".")
-        try:
-            amount = Decimal(amount_raw)
-            return int((amount * 100).to_integral_value())
-        except InvalidOperation:
-            pass
-
-    # Try table-style format where headers and values are on separate lines
-    lines = text.split('\n')
-    for i, line in enumerate(lines):
-        if 'Rechnungsbetrag' in line and i + 1 < len(lines):
-            next_line = lines[i + 1]
-            # Extract the last amount (should be the total)
-            amounts = re.findall(r'([0-9]+(?:\.[0-9]{3})*,[0-9]{2})\s*€', next_line)
-            if amounts:
-                amount_raw = amounts[-1].replace(".", "").replace(",", ".")
-                try:
-                    amount = Decimal(amount_raw)
-                    return int((amount * 100).to_integral_value())
-                except InvalidOperation:
-                    pass
+        return _amount_to_cents(total_match.group(1))
+
+    # Try table-style format where headers and values are on separate lines.
+    # The line after each "Rechnungsbetrag" line is searched in place (pos/endpos)
+    # instead of splitting the whole text into lines.
+    pos = text.find("Rechnungsbetrag")
+    while pos >= 0:
+        line_end = text.find("\n", pos)
+        if line_end < 0:
+            break  # Last line, no values below it
+        next_end = text.find("\n", line_end + 1)
+        if next_end < 0:
+            next_end = len(text)
+        # Extract the last amount (should be the total)
+        amounts = AMOUNT_PATTERN.findall(text, line_end + 1, next_end)
+        if amounts:
+            return _amount_to_cents(amounts[-1])
+        pos = text.find("Rechnungsbetrag", line_end + 1)
 
     raise ValueError("Gesamtsumme nicht gefunden")
 
 
-def parse_invoice(pdf_path: Path, storage_path: str) -> InvoiceRecord:
-    text = extract_text(pdf_path)
+def _has_invoice_fields(text: str) -> bool:
+    """True if date, invoice number, total and recipient address are all in *text*."""
+    return bool(
+        DATE_PATTERN.search(text)
+        and INVOICE_NO_PATTERN.search(text)
+        and _search_total(text)
+        and _parse_recipient_block(_find_recipient_block(text.splitlines()))
+    )
+
+
+def parse_invoice(pdf_path: Path, storage_path: str, data: Optional[bytes] = None) -> InvoiceRecord:
+    try:
+        return _parse_pages(pdf_path, storage_path, iter_pages(pdf_path, data))
+    except ValueError as exc:
+        # The fast engines lay out some PDFs differently: retry with pdfplumber
+        if not (USE_PYPDF or USE_PDFIUM) or "Stornobeleg" in str(exc):
+            raise
+        logging.debug("%s mit %s nicht lesbar (%s) - nutze pdfplumber", pdf_path, PDF_TEXT_ENGINE, exc)
+        return _parse_pages(pdf_path, storage_path, _iter_pages_fallback(pdf_path, data))
+
+
+def _parse_pages(pdf_path: Path, storage_path: str, page_texts: Iterable[str]) -> InvoiceRecord:
+    # Extract page by page until the pages read so far contain every field;
+    # only those pages are joined and run through the field regexes
+    page_iter = iter(page_texts)
+    pages: list[str] = []
+    for page_text in page_iter:
+        pages.append(page_text)
+        if _has_invoice_fields("\n".join(pages)):
+            break
+    text = "\n".join(pages)
 
-    # Check if this is a Stornobeleg
-    if is_storno_document(text):
+    # Check if this is a Stornobeleg. The storno markers can be on a later page
+    # than the invoice fields, so the remaining pages are still read for this
+    # one check (no keyword spans a page break)
+    if is_storno_document(text) or any(is_storno_document(page) for page in page_iter):
         raise ValueError("Stornobeleg - wird nicht importiert")
 
-    lines = [line for line in text.splitlines() if line.strip()]
+    # Strip once here, extract_customer relies on it
+    lines = [line for line in (raw.strip() for raw in text.splitlines()) if line]
 
     date_match = DATE_PATTERN.search(text)
     if not date_match:
         # Fallback: Try to extract date from filename
-        # Format: "Beleg gespeichert X-Re 'XXXXX' vom 'DD.MM.YYYY' für Name.pdf"
-        filename_date_pattern = re.compile(r"vom\s+'(\d{2}\.\d{2}\.\d{4})'")
-        filename_match = filename_date_pattern.search(pdf_path.name)
+        filename_match = FILENAME_DATE_PATTERN.search(pdf_path.name)
         if filename_match:
             invoice_date = datetime.strptime(filename_match.group(1), "%d.%m.%Y").date().isoformat()
         else:
@@ -970,11 +1220,12 @@ def parse_invoice(pdf_path: Path, storage_path: str) -> InvoiceRecord:
 
 def get_or_create_snapshot(conn: sqlite3.Connection, snapshot_date: str, folder_name: str) -> int:
     """Get or create a snapshot and return its ID."""
-    cursor = conn.execute(
+    # Look up first and insert only when missing: an INSERT that hits the
+    # UNIQUE constraint (upsert or OR IGNORE) still uses up an AUTOINCREMENT id
+    row = conn.execute(
         "SELECT id FROM snapshots WHERE snapshot_date = ?",
         (snapshot_date,)
-    )
-    row = cursor.fetchone()
+    ).fetchone()
     if row:
         return row[0]
 
@@ -987,14 +1238,15 @@ def get_or_create_snapshot(conn: sqlite3.Connection, snapshot_date: str, folder_
 
 def get_or_create_invoice(conn: sqlite3.Connection, record: InvoiceRecord) -> int:
     """Get or create an invoice and return its ID."""
-    cursor = conn.execute(
+    # Same order as get_or_create_snapshot. Invoices without number never
+    # match ("= NULL"), so they are always inserted
+    row = conn.execute(
         """
         SELECT id FROM invoices
         WHERE invoice_number = ? AND customer_name = ? AND amount_cents = ?
         """,
         (record.invoice_number, record.customer_name, record.amount_cents)
-    )
-    row = cursor.fetchone()
+    ).fetchone()
     if row:
         return row[0]
 
@@ -1035,19 +1287,38 @@ def link_invoice_to_snapshot(
     file_path: str
 ) -> bool:
     """Link an invoice to a snapshot. Returns True if new link created."""
-    try:
-        conn.execute(
-            """
-            INSERT INTO invoice_snapshots (invoice_id, snapshot_id, file_path)
-            VALUES (?, ?, ?)
-            """,
-            (invoice_id, snapshot_id, file_path)
-        )
-        return True
-    except sqlite3.IntegrityError:
-        # Link already exists
+    # Check the UNIQUE(invoice_id, snapshot_id) index instead of catching
+    # IntegrityError; not INSERT OR IGNORE, which still uses up an
+    # AUTOINCREMENT id when the link exists (see get_or_create_snapshot)
+    if conn.execute(
+        "SELECT 1 FROM invoice_snapshots WHERE invoice_id = ? AND snapshot_id = ?",
+        (invoice_id, snapshot_id)
+    ).fetchone():
         return False
 
+    conn.execute(
+        """
+        INSERT INTO invoice_snapshots (invoice_id, snapshot_id, file_path)
+        VALUES (?, ?, ?)
+        """,
+        (invoice_id, snapshot_id, file_path)
+    )
+    return True
+
+
+# Eine Session für alle Nebius-Anfragen: Keep-Alive spart TCP-/TLS-Aufbau pro Name
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(pool_maxsize=16, max_retries=Retry(total=2, backoff_factor=0.2)),
+)
+
+
+def _json_loads(data):
+    """json.loads via orjson when installed (accepts str or bytes). Its
+    JSONDecodeError subclasses json.JSONDecodeError, so callers catch either."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
 
 # Known names that AI might not recognize correctly
 # Maps lowercase first name -> "Herr" or "Frau"
@@ -1058,14 +1329,35 @@ KNOWN_NAMES_GENDER = {
 }
 
 
+# Antworten des gender-guesser-Wörterbuchs, die als eindeutig gelten;
+# "andy" (beides) und "unknown" gehen weiter an die KI
+DICTIONARY_GENDERS = {
+    "male": "Herr",
+    "mostly_male": "Herr",
+    "female": "Frau",
+    "mostly_female": "Frau",
+}
+
+
+@lru_cache(maxsize=1)
+def _gender_dictionary():
+    """gender-guesser detector, loaded on first use (reads its name list once)."""
+    return gender_detector.Detector(case_sensitive=False)
+
+
 def lookup_known_gender(first_name: str) -> Optional[str]:
     """
-    Check if a first name is in the known names lookup table.
+    Check if a first name is in the known names lookup table or, if the
+    optional gender-guesser package is installed, in its first-name dictionary.
     Returns "Herr" or "Frau" if found, None otherwise.
     """
     if not first_name:
         return None
-    return KNOWN_NAMES_GENDER.get(first_name.lower().strip())
+    first_name = first_name.strip()
+    known = KNOWN_NAMES_GENDER.get(first_name.lower())
+    if known or gender_detector is None:
+        return known
+    return DICTIONARY_GENDERS.get(_gender_dictionary().get_gender(first_name))
 
 
 def extract_first_name(customer_name: str) -> Optional[str]:
@@ -1108,14 +1400,26 @@ def determine_gender_via_ai(first_name: str) -> Optional[str]:
         api_key = os.getenv('NEBIUS_API_KEY')
         if not api_key:
             return None
+        return _query_gender_ai(first_name, api_key)
 
-        url = "https://api.studio.nebius.com/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
+    except Exception as e:
+        logging.warning(f"Gender AI determination failed for '{first_name}': {e}")
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _query_gender_ai(first_name: str, api_key: str) -> Optional[str]:
+    """
+    Ask the AI for the gender of a first name. Answers are cached per name;
+    errors are raised (and therefore not cached) so a failed call is retried.
+    """
+    url = "https://api.studio.nebius.com/v1/chat/completions"
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
 
-        prompt = f"""Bestimme das Geschlecht des Vornamens "{first_name}".
+    prompt = f"""Bestimme das Geschlecht des Vornamens "{first_name}".
 Antworte NUR mit einem dieser Wörter:
 - "männlich" wenn der Name typischerweise männlich ist
 - "weiblich" wenn der Name typischerweise weiblich ist
@@ -1123,28 +1427,24 @@ Antworte NUR mit einem dieser Wörter:
 
 Antwort:"""
 
-        payload = {
-            "model": "meta-llama/Llama-3.3-70B-Instruct",
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.1,
-            "max_tokens": 10
-        }
-
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        response.raise_for_status()
+    payload = {
+        "model": "meta-llama/Llama-3.3-70B-Instruct",
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.1,
+        "max_tokens": 10
+    }
 
-        data = response.json()
-        ai_response = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip().lower()
+    response = _SESSION.post(url, headers=headers, json=payload, timeout=10)
+    response.raise_for_status()
 
-        if "männlich" in ai_response or "male" in ai_response:
-            return "Herr"
-        elif "weiblich" in ai_response or "female" in ai_response:
-            return "Frau"
-        else:
-            return None
+    data = _json_loads(response.content)
+    ai_response = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip().lower()
 
-    except Exception as e:
-        logging.warning(f"Gender AI determination failed for '{first_name}': {e}")
+    if "männlich" in ai_response or "male" in ai_response:
+        return "Herr"
+    elif "weiblich" in ai_response or "female" in ai_response:
+        return "Frau"
+    else:
         return None
 
 
@@ -1204,10 +1504,10 @@ Antwort (nur das JSON-Array, keine Erklärung):"""
             "max_tokens": len(names_to_query) * 5 + 20
         }
 
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
+        response = _SESSION.post(url, headers=headers, json=payload, timeout=30)
         response.raise_for_status()
 
-        data = response.json()
+        data = _json_loads(response.content)
         ai_response = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
 
         # Parse JSON response
@@ -1216,7 +1516,7 @@ Antwort (nur das JSON-Array, keine Erklärung):"""
             start = ai_response.find('[')
             end = ai_response.rfind(']') + 1
             if start >= 0 and end > start:
-                genders = json.loads(ai_response[start:end])
+                genders = _json_loads(ai_response[start:end])
             else:
                 for name in names_to_query:
                     result[name] = None
@@ -1258,10 +1558,184 @@ def determine_salutation_for_customer(customer_name: str) -> Optional[str]:
     return determine_gender_via_ai(first_name)
 
 
-def validate_customer_names_batch_via_ai(customer_names: list[str]) -> dict[str, bool]:
+def store_salutations(conn: sqlite3.Connection, salutations: dict[str, str]) -> None:
+    """Upsert customer_name -> salutation into customer_details."""
+    conn.executemany(
+        """
+        INSERT INTO customer_details (customer_name, salutation, updated_at)
+        VALUES (?, ?, datetime('now', 'localtime'))
+        ON CONFLICT(customer_name) DO UPDATE SET
+            salutation = excluded.salutation,
+            updated_at = datetime('now', 'localtime')
+        """,
+        salutations.items()
+    )
+    for customer_name, salutation in salutations.items():
+        logging.info("Anrede für %s automatisch ermittelt: %s", customer_name, salutation)
+
+
+def _select_in(conn: sqlite3.Connection, query: str, keys: list) -> Iterator[sqlite3.Row]:
+    """Run *query* ("{}" marks the IN list) once per SQL_IN_CHUNK keys."""
+    for offset in range(0, len(keys), SQL_IN_CHUNK):
+        chunk = keys[offset:offset + SQL_IN_CHUNK]
+        yield from conn.execute(query.format(",".join("?" * len(chunk))), chunk)
+
+
+def load_cached_genders(conn: sqlite3.Connection, first_names: Iterable[str]) -> dict[str, str]:
+    """
+    Salutations already known for *first_names* without asking the AI:
+    lookup_known_gender (takes precedence, it corrects AI mistakes) and
+    earlier AI answers. Names without a result are missing from the dict.
+    """
+    result = {}
+    by_key: dict[str, list[str]] = {}
+    for name in first_names:
+        known = lookup_known_gender(name)
+        if known:
+            result[name] = known
+        else:
+            by_key.setdefault(name.lower(), []).append(name)
+    for key, salutation in _select_in(
+        conn,
+        "SELECT first_name, salutation FROM ai_gender_cache WHERE first_name IN ({})",
+        list(by_key),
+    ):
+        for name in by_key[key]:
+            result[name] = salutation
+    return result
+
+
+def store_cached_genders(conn: sqlite3.Connection, genders: dict[str, Optional[str]]) -> None:
+    """Remember AI gender answers; None (unknown or failed) is not cached."""
+    conn.executemany(
+        "INSERT OR IGNORE INTO ai_gender_cache (first_name, salutation) VALUES (?, ?)",
+        [
+            (name.lower(), salutation)
+            for name, salutation in genders.items()
+            if salutation and not lookup_known_gender(name)
+        ]
+    )
+
+
+def load_cached_name_validity(conn: sqlite3.Connection, customer_names: Iterable[str]) -> dict[str, bool]:
+    """Earlier AI verdicts for *customer_names* (names without one are missing)."""
+    return {
+        name: bool(valid)
+        for name, valid in _select_in(
+            conn,
+            "SELECT customer_name, valid FROM ai_name_validity_cache WHERE customer_name IN ({})",
+            list(set(customer_names)),
+        )
+    }
+
+
+def store_cached_name_validity(conn: sqlite3.Connection, validities: dict[str, bool]) -> None:
+    """Remember name verdicts from ask_name_validity_via_ai."""
+    conn.executemany(
+        "INSERT OR IGNORE INTO ai_name_validity_cache (customer_name, valid) VALUES (?, ?)",
+        [(name, int(valid)) for name, valid in validities.items()]
+    )
+
+
+def queue_salutation(conn: sqlite3.Connection, customer_name: str) -> None:
+    """Remember a customer whose salutation is still unknown (see drain_pending_salutations)."""
+    conn.execute(
+        "INSERT OR IGNORE INTO pending_salutations (customer_name) VALUES (?)",
+        (customer_name,)
+    )
+
+
+def drain_pending_salutations(conn: sqlite3.Connection) -> None:
+    """Determine the salutations of all queued customers and empty the queue.
+    Customers that got a salutation in the meantime are not looked up again."""
+    queued = [row[0] for row in conn.execute("SELECT customer_name FROM pending_salutations")]
+    if not queued:
+        return
+    missing = [
+        row[0] for row in conn.execute(
+            """
+            SELECT p.customer_name
+            FROM pending_salutations p
+            LEFT JOIN customer_details cd ON cd.customer_name = p.customer_name
+            WHERE cd.salutation IS NULL OR cd.salutation = ''
+            """
+        )
+    ]
+    resolve_salutations(conn, missing)
+    conn.executemany(
+        "DELETE FROM pending_salutations WHERE customer_name = ?",
+        [(name,) for name in queued]
+    )
+    conn.commit()
+
+
+def salutation_worker(db_path: Path, stop: threading.Event) -> None:
+    """Background thread for main(): drain the salutation queue every
+    SALUTATION_POLL_SECONDS until *stop* is set, then one last time."""
+    conn = open_conn(db_path)
+    try:
+        while True:
+            stopping = stop.is_set()
+            try:
+                drain_pending_salutations(conn)
+            except sqlite3.Error as exc:
+                conn.rollback()
+                logging.warning("Anreden konnten nicht ermittelt werden: %s", exc)
+            if stopping:
+                break
+            stop.wait(SALUTATION_POLL_SECONDS)
+    finally:
+        conn.close()
+
+
+def resolve_salutations(conn: sqlite3.Connection, customer_names: Iterable[str]) -> None:
+    """
+    Determine missing salutations for several customers at once. First names
+    already answered earlier come from ai_gender_cache; the remaining AI requests
+    run in a thread pool so their latencies overlap; one executemany stores them.
+    """
+    names = sorted(set(customer_names))
+    if not names:
+        return
+    first_names = {name: extract_first_name(name) for name in names}
+    genders = load_cached_genders(conn, filter(None, first_names.values()))
+    missing = sorted({first for first in first_names.values() if first and first not in genders})
+    with ThreadPoolExecutor(max_workers=SALUTATION_WORKERS) as executor:
+        answers = dict(zip(missing, executor.map(determine_gender_via_ai, missing)))
+    store_cached_genders(conn, answers)
+    genders.update(answers)
+    salutations = {
+        name: genders[first]
+        for name, first in first_names.items()
+        if first and genders.get(first)
+    }
+    store_salutations(conn, salutations)
+
+
+# Kryptische Einrichtungs-Codes aus zwei Wörtern ("Station 3", "Dialyse B7",
+# "b7 Dialyse") sind nie gültige Kunden; Einzelwörter fängt schon die Leerzeichen-Regel ab
+_CRYPTIC_NAME_RE = re.compile(
+    r"^(?:station\s+\w*\d\w*|dialyse\s+\w*\d\w*|\w*\d\w*\s+dialyse)$",
+    re.IGNORECASE
+)
+
+
+def validate_customer_names_batch_via_ai(customer_names: list[str]) -> dict[str, bool]:
+    """
+    Use Nebius AI to validate whether customer names are plausible person names.
+    Returns a dict mapping customer_name -> True (valid) / False (invalid/suspicious).
+    Names the AI could not judge (no API key, request or parse error) count as
+    valid, so they are not flagged.
+    """
+    verdicts = ask_name_validity_via_ai(customer_names)
+    return {name: verdicts.get(name, True) for name in customer_names}
+
+
+def ask_name_validity_via_ai(customer_names: list[str]) -> dict[str, bool]:
     """
-    Use Nebius AI to validate whether customer names are plausible person names.
-    Returns a dict mapping customer_name -> True (valid) / False (invalid/suspicious)
+    Like validate_customer_names_batch_via_ai, but only contains the names that
+    were actually judged (by the local rules or the AI), so the result can
+    be cached. Names whose lookup failed are missing.
 
     Examples of invalid names:
     - "Herr" (just a title)
@@ -1281,21 +1755,30 @@ def validate_customer_names_batch_via_ai(customer_names: list[str]) -> dict[str,
         if ' ' not in name_stripped:
             # Single word = invalid (could be place name, title, etc.)
             result[name] = False
+        elif _CRYPTIC_NAME_RE.match(name_stripped):
+            # "Station 3", "Dialyse B7", "b7 Dialyse": never a customer
+            result[name] = False
         else:
             names_for_ai.append(name)
 
-    # If all names were single words, return early
+    # If all names were judged locally, return early
     if not names_for_ai:
         return result
 
-    try:
-        api_key = os.getenv('NEBIUS_API_KEY')
-        if not api_key:
-            # If no API key, assume remaining names are valid (don't flag them)
-            for name in names_for_ai:
-                result[name] = True
-            return result
+    api_key = os.getenv('NEBIUS_API_KEY')
+    if not api_key:
+        return result
+
+    # Large batches are split so max_tokens and the answer time stay bounded
+    for offset in range(0, len(names_for_ai), AI_NAME_CHUNK):
+        result.update(_ask_name_validity_chunk(names_for_ai[offset:offset + AI_NAME_CHUNK], api_key))
+    return result
 
+
+def _ask_name_validity_chunk(names_for_ai: list[str], api_key: str) -> dict[str, bool]:
+    """One Nebius request of ask_name_validity_via_ai; empty dict on failure."""
+    result = {}
+    try:
         url = "https://api.studio.nebius.com/v1/chat/completions"
         headers = {
             "Authorization": f"Bearer {api_key}",
@@ -1331,10 +1814,10 @@ Antworte NUR mit JSON-Array [true/false, ...]:"""
             "max_tokens": len(names_for_ai) * 10 + 20
         }
 
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
+        response = _SESSION.post(url, headers=headers, json=payload, timeout=30)
         response.raise_for_status()
 
-        data = response.json()
+        data = _json_loads(response.content)
         ai_response = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
 
         # Parse JSON response
@@ -1343,34 +1826,32 @@ Antworte NUR mit JSON-Array [true/false, ...]:"""
             start = ai_response.find('[')
             end = ai_response.rfind(']') + 1
             if start >= 0 and end > start:
-                validities = json.loads(ai_response[start:end])
+                validities = _json_loads(ai_response[start:end])
             else:
-                # If parsing fails, assume remaining names are valid
-                for name in names_for_ai:
-                    result[name] = True
                 return result
         except json.JSONDecodeError:
-            for name in names_for_ai:
-                result[name] = True
             return result
 
-        # Map AI results to names_for_ai
-        for i, name in enumerate(names_for_ai):
-            if i < len(validities):
-                result[name] = bool(validities[i])
-            else:
-                result[name] = True  # Assume valid if missing
+        # Map AI results to names_for_ai (names missing in the answer stay unjudged)
+        for name, valid in zip(names_for_ai, validities):
+            result[name] = bool(valid)
 
         return result
 
     except Exception as e:
         logging.error(f"Batch name validation failed: {e}")
-        # On error, assume remaining names are valid (don't flag them)
-        for name in names_for_ai:
-            result[name] = True
         return result
 
 
+# Satzzeichen für normalize_string: "." und "," entfernen, "-" wird Leerzeichen
+_PUNCTUATION_TABLE = str.maketrans({".": None, ",": None, "-": " "})
+# "str", "straße" und "strasse" werden in einem Durchgang zu "strasse"
+_STREET_ABBREV_RE = re.compile(r"str(?:aße|asse)?")
+
+
+# Gecacht: find_similar_customers normalisiert bei jedem neuen Kunden alle
+# bestehenden Kunden erneut
+@lru_cache(maxsize=8192)
 def normalize_string(text: str) -> str:
     """
     Normalize a string for comparison by removing common variations.
@@ -1378,27 +1859,14 @@ def normalize_string(text: str) -> str:
     if not text:
         return ""
 
-    # Convert to lowercase
-    normalized = text.lower().strip()
+    # Lowercase and remove common punctuation ("str." is "str" afterwards)
+    normalized = text.lower().translate(_PUNCTUATION_TABLE)
 
-    # Remove common punctuation
-    normalized = normalized.replace(".", "").replace(",", "").replace("-", " ")
-
-    # Replace common abbreviations
-    replacements = {
-        "str": "strasse",
-        "straße": "strasse",
-        "strasse": "strasse",
-        "str.": "strasse",
-    }
-
-    for old, new in replacements.items():
-        normalized = normalized.replace(old, new)
+    # Unify street abbreviations
+    normalized = _STREET_ABBREV_RE.sub("strasse", normalized)
 
     # Remove extra whitespace
-    normalized = " ".join(normalized.split())
-
-    return normalized
+    return " ".join(normalized.split())
 
 
 def highlight_diff(text1: str, text2: str) -> tuple[str, str]:
@@ -1408,36 +1876,125 @@ def highlight_diff(text1: str, text2: str) -> tuple[str, str]:
     Returns:
         Tuple of (text1_highlighted, text2_highlighted)
     """
-    import difflib
-    import html
-
     if not text1 or not text2:
         return (html.escape(text1 or ""), html.escape(text2 or ""))
-
-    # Use SequenceMatcher to find differences
-    matcher = difflib.SequenceMatcher(None, text1, text2)
+    if text1 == text2:
+        return (html.escape(text1), html.escape(text2))
 
     result1 = []
     result2 = []
 
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+    def mark(i1: int, i2: int, j1: int, j2: int) -> None:
         text1_part = html.escape(text1[i1:i2])
         text2_part = html.escape(text2[j1:j2])
-
-        if tag == 'equal':
-            result1.append(text1_part)
-            result2.append(text2_part)
-        elif tag == 'replace':
+        if i1 < i2 and j1 < j2:
             result1.append(f'<mark class="diff-change">{text1_part}</mark>')
             result2.append(f'<mark class="diff-change">{text2_part}</mark>')
-        elif tag == 'delete':
+        elif i1 < i2:
             result1.append(f'<mark class="diff-delete">{text1_part}</mark>')
-        elif tag == 'insert':
+        else:
             result2.append(f'<mark class="diff-insert">{text2_part}</mark>')
 
+    # Levenshtein alignment computed by rapidfuzz in C; consecutive edits are
+    # merged into one change (like difflib's "replace" opcodes)
+    edit = None
+    for tag, i1, i2, j1, j2 in Levenshtein.opcodes(text1, text2):
+        if tag != 'equal':
+            edit = (edit[0], i2, edit[2], j2) if edit else (i1, i2, j1, j2)
+            continue
+        if edit:
+            mark(*edit)
+            edit = None
+        result1.append(html.escape(text1[i1:i2]))
+        result2.append(html.escape(text2[j1:j2]))
+    if edit:
+        mark(*edit)
+
     return (''.join(result1), ''.join(result2))
 
 
+@dataclass
+class _CustomerCache:
+    """Distinct (name, street, city) of all invoices with the invoice count per
+    name, kept between find_similar_customers calls on one connection."""
+    conn: sqlite3.Connection
+    data_version: int
+    max_id: int = 0
+    sort_keys: list = field(default_factory=list)
+    customers: list = field(default_factory=list)
+    norm_names: list = field(default_factory=list)
+    invoice_counts: dict = field(default_factory=dict)
+
+
+# Nur ein Eintrag für die zuletzt benutzte Verbindung (sqlite3.Connection
+# unterstützt keine weakrefs, id() kann nach dem Schließen wiederverwendet werden)
+_customer_cache: Optional[_CustomerCache] = None
+
+
+def _customer_sort_key(name: str, street: Optional[str], city: Optional[str]) -> tuple:
+    # Same order as ORDER BY customer_name, customer_street, customer_city (NULL first)
+    return (name, street is not None, street or "", city is not None, city or "")
+
+
+def _invalidate_customer_cache() -> None:
+    """Drop the find_similar_customers cache (after renaming invoice customers)."""
+    global _customer_cache
+    _customer_cache = None
+
+
+def _existing_customers(conn: sqlite3.Connection) -> _CustomerCache:
+    """
+    Customer list for find_similar_customers. Rebuilt when another connection
+    committed in the meantime (PRAGMA data_version); invoices inserted through
+    this connection since the last call are merged in, so an import does not
+    re-read and re-normalize all customers for every new one.
+    """
+    global _customer_cache
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    max_id = conn.execute("SELECT IFNULL(MAX(id), 0) FROM invoices").fetchone()[0]
+    cache = _customer_cache
+    if (
+        cache is None
+        or cache.conn is not conn
+        or cache.data_version != data_version
+        or max_id < cache.max_id
+    ):
+        cache = _customer_cache = _CustomerCache(conn, data_version)
+    if max_id == cache.max_id:
+        return cache
+
+    rebuild = cache.max_id == 0
+    rows = conn.execute(
+        """
+        SELECT customer_name, customer_street, customer_city, COUNT(*)
+        FROM invoices
+        WHERE id > ? AND customer_name IS NOT NULL
+        GROUP BY customer_name, customer_street, customer_city
+        """,
+        (cache.max_id,)
+    )
+    for name, street, city, count in rows:
+        cache.invoice_counts[name] = cache.invoice_counts.get(name, 0) + count
+        key = _customer_sort_key(name, street, city)
+        if rebuild:
+            cache.sort_keys.append(key)
+            continue
+        idx = bisect.bisect_left(cache.sort_keys, key)
+        if idx == len(cache.sort_keys) or cache.sort_keys[idx] != key:
+            cache.sort_keys.insert(idx, key)
+            cache.customers.insert(idx, (name, street, city))
+            cache.norm_names.insert(idx, normalize_string(name))
+    if rebuild:
+        cache.sort_keys.sort()
+        cache.customers = [
+            (name, street if has_street else None, city if has_city else None)
+            for name, has_street, street, has_city, city in cache.sort_keys
+        ]
+        cache.norm_names = [normalize_string(name) for name, _, _ in cache.customers]
+    cache.max_id = max_id
+    return cache
+
+
 def find_similar_customers(
     conn: sqlite3.Connection,
     customer_name: str,
@@ -1458,14 +2015,9 @@ def find_similar_customers(
     Returns:
         List of dictionaries with similar customer data and similarity scores
     """
-    # Get all existing customers from invoices
-    cursor = conn.execute("""
-        SELECT DISTINCT customer_name, customer_street, customer_city
-        FROM invoices
-        WHERE customer_name IS NOT NULL
-    """)
-
-    existing_customers = cursor.fetchall()
+    # All existing customers from invoices (cached, see _existing_customers),
+    # with the number of invoices per name (all addresses)
+    existing = _existing_customers(conn)
     similar_customers = []
 
     # Normalize input
@@ -1473,15 +2025,31 @@ def find_similar_customers(
     norm_street = normalize_string(customer_street or "")
     norm_city = normalize_string(customer_city or "")
 
-    for existing_name, existing_street, existing_city in existing_customers:
+    # Street and city can add at most (1 - name weight) * 100 to the weighted
+    # score, so a customer whose name score stays below this bound can never
+    # reach the threshold. rapidfuzz filters the names in one C loop; the
+    # exact scores are only computed for the remaining candidates. The margin
+    # of 1 covers fuzz.ratio rounding to int.
+    name_weight = 0.5 if norm_street and norm_city else 0.7 if norm_street else 1.0
+    min_name_score = (similarity_threshold - (1 - name_weight) * 100) / name_weight - 1
+    candidates = rf_process.extract_iter(
+        norm_name, existing.norm_names, scorer=rf_fuzz.ratio, score_cutoff=max(0, min_name_score)
+    )
+
+    for norm_existing_name, _, idx in candidates:
+        existing_name, existing_street, existing_city = existing.customers[idx]
+        invoice_count = existing.invoice_counts[existing_name]
         # Normalize existing data
-        norm_existing_name = normalize_string(existing_name)
         norm_existing_street = normalize_string(existing_street or "")
         norm_existing_city = normalize_string(existing_city or "")
 
         # Calculate similarity scores for each field
         name_score = fuzz.ratio(norm_name, norm_existing_name)
         street_score = fuzz.ratio(norm_street, norm_existing_street) if norm_street and norm_existing_street else 0
+        # Even a perfect city score adds at most 20: skip the city comparison
+        # for candidates that cannot reach the threshold anyway
+        if norm_street and norm_city and (name_score * 0.5) + (street_score * 0.3) + 20 < similarity_threshold:
+            continue
         city_score = fuzz.ratio(norm_city, norm_existing_city) if norm_city and norm_existing_city else 0
 
         # Calculate weighted average (name is most important)
@@ -1495,12 +2063,6 @@ def find_similar_customers(
 
         # If overall similarity is above threshold, add to results
         if overall_score >= similarity_threshold:
-            # Count how many invoices this customer has
-            invoice_count = conn.execute(
-                "SELECT COUNT(*) FROM invoices WHERE customer_name = ?",
-                (existing_name,)
-            ).fetchone()[0]
-
             # Calculate diff highlights for name, street, and city
             name_new_hl, name_old_hl = highlight_diff(customer_name, existing_name)
             street_new_hl, street_old_hl = highlight_diff(customer_street or "", existing_street or "")
@@ -1553,6 +2115,41 @@ def merge_customers(
     Returns:
         Number of invoices updated
     """
+    # All statements in one write transaction: one commit, and a failure
+    # leaves neither half-renamed invoices nor a partial history behind
+    _begin_write(conn)
+    try:
+        count = _merge_customers(
+            conn,
+            old_customer_name, old_customer_street, old_customer_city,
+            new_customer_name, new_customer_street, new_customer_city,
+        )
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+
+    if count:
+        logging.info(
+            "Kunden zusammengeführt: '%s' -> '%s' (%d Rechnungen aktualisiert)",
+            old_customer_name,
+            new_customer_name,
+            count
+        )
+
+    return count
+
+
+def _merge_customers(
+    conn: sqlite3.Connection,
+    old_customer_name: str,
+    old_customer_street: str,
+    old_customer_city: str,
+    new_customer_name: str,
+    new_customer_street: str,
+    new_customer_city: str
+) -> int:
+    """merge_customers without transaction handling."""
     # Count invoices to be updated
     count = conn.execute(
         "SELECT COUNT(*) FROM invoices WHERE customer_name = ?",
@@ -1580,6 +2177,7 @@ def merge_customers(
             old_customer_name,
         )
     )
+    _invalidate_customer_cache()
 
     # Check if customer_details exists for old customer
     old_details = conn.execute(
@@ -1612,33 +2210,24 @@ def merge_customers(
             (old_customer_name,)
         )
 
-    # Log the merge operation for all affected invoices
-    invoice_ids = conn.execute(
-        "SELECT id FROM invoices WHERE customer_name = ?",
-        (new_customer_name,)
-    ).fetchall()
-
-    for (invoice_id,) in invoice_ids:
-        log_invoice_event(
-            conn,
-            invoice_id,
-            "CUSTOMER_MERGED",
-            {
+    # Log the merge operation for all affected invoices: the metadata is the
+    # same for every invoice, so serialize it once and insert in one statement
+    conn.execute(
+        """
+        INSERT INTO invoice_history (invoice_id, event_type, metadata)
+        SELECT id, 'CUSTOMER_MERGED', ? FROM invoices WHERE customer_name = ?
+        """,
+        (
+            _metadata_json({
                 "old_customer_name": old_customer_name,
                 "old_customer_street": old_customer_street,
                 "old_customer_city": old_customer_city,
                 "new_customer_name": new_customer_name,
                 "new_customer_street": new_customer_street,
                 "new_customer_city": new_customer_city,
-            }
+            }),
+            new_customer_name,
         )
-
-    conn.commit()
-    logging.info(
-        "Kunden zusammengeführt: '%s' -> '%s' (%d Rechnungen aktualisiert)",
-        old_customer_name,
-        new_customer_name,
-        count
     )
 
     return count
@@ -1651,7 +2240,8 @@ def update_customer_data_for_all_invoices(
     old_city: str,
     new_name: str,
     new_street: str,
-    new_city: str
+    new_city: str,
+    commit: bool = True
 ) -> int:
     """
     Update customer data for all invoices matching the old data.
@@ -1664,6 +2254,7 @@ def update_customer_data_for_all_invoices(
         new_name: New customer name
         new_street: New customer street
         new_city: New customer city
+        commit: Commit right away (False when part of a larger transaction)
 
     Returns:
         Number of invoices updated
@@ -1684,9 +2275,11 @@ def update_customer_data_for_all_invoices(
         (new_name, new_street, new_city, new_address,
          old_name, old_street, old_city)
     )
+    _invalidate_customer_cache()
 
     updated_count = cursor.rowcount
-    conn.commit()
+    if commit:
+        conn.commit()
 
     logging.info(
         "Kundendaten aktualisiert: '%s' -> '%s' (%d Rechnungen)",
@@ -1759,6 +2352,74 @@ def resolve_pending_import(
     Returns:
         True if resolved successfully, False otherwise
     """
+    # One write transaction for the whole resolution (invoice, customer update,
+    # history, mapping, status): nothing is left half-done if a step fails
+    _begin_write(conn)
+    try:
+        resolved = _resolve_pending_import(
+            conn, pending_import_id, action, selected_customer, use_new_data
+        )
+    except Exception:
+        conn.rollback()
+        raise
+    if resolved:
+        conn.commit()
+    else:
+        conn.rollback()
+    return resolved
+
+
+def resolve_pending_imports_bulk(
+    conn: sqlite3.Connection,
+    resolutions: Iterable[tuple[int, str, Optional[dict], bool]]
+) -> list[int]:
+    """
+    Resolve several pending imports, given as (pending_import_id, action,
+    selected_customer, use_new_data) tuples, in one write transaction.
+
+    Each import runs in its own SAVEPOINT, so a failing one does not undo the
+    others. The salutations of all resulting customers are determined
+    afterwards in a single drain_pending_salutations pass instead of one
+    lookup per import.
+
+    Returns:
+        IDs of the pending imports that were resolved
+    """
+    resolved_ids = []
+    _begin_write(conn)
+    try:
+        for pending_import_id, action, selected_customer, use_new_data in resolutions:
+            conn.execute("SAVEPOINT pending_import")
+            try:
+                resolved = _resolve_pending_import(
+                    conn, pending_import_id, action, selected_customer, use_new_data
+                )
+            except Exception as exc:
+                logging.error("Pending import %d konnte nicht aufgelöst werden: %s", pending_import_id, exc)
+                resolved = False
+            if not resolved:
+                conn.execute("ROLLBACK TO pending_import")
+            conn.execute("RELEASE pending_import")
+            if resolved:
+                resolved_ids.append(pending_import_id)
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+
+    if resolved_ids:
+        drain_pending_salutations(conn)
+    return resolved_ids
+
+
+def _resolve_pending_import(
+    conn: sqlite3.Connection,
+    pending_import_id: int,
+    action: str,
+    selected_customer: Optional[dict],
+    use_new_data: bool
+) -> bool:
+    """resolve_pending_import without transaction handling."""
     # Get pending import data
     pending = conn.execute(
         """
@@ -1835,7 +2496,8 @@ def resolve_pending_import(
             updated_count = update_customer_data_for_all_invoices(
                 conn,
                 old_name, old_street, old_city,
-                final_name, final_street, final_city
+                final_name, final_street, final_city,
+                commit=False
             )
 
             logging.info(
@@ -1899,6 +2561,10 @@ def resolve_pending_import(
         target_name, target_street, target_city,
     )
 
+    # Same as the regular import path: the salutation lookup runs later,
+    # outside of this transaction (see drain_pending_salutations)
+    queue_salutation(conn, target_name)
+
     # Mark pending import as resolved
     conn.execute(
         """
@@ -1910,10 +2576,14 @@ def resolve_pending_import(
         (pending_import_id,)
     )
 
-    conn.commit()
     return True
 
 
+def _metadata_json(metadata: Optional[dict]) -> Optional[str]:
+    """Serialize history metadata compactly (no whitespace, umlauts as-is)."""
+    return json.dumps(metadata, separators=(",", ":"), ensure_ascii=False) if metadata else None
+
+
 def log_invoice_event(
     conn: sqlite3.Connection,
     invoice_id: int,
@@ -1929,8 +2599,7 @@ def log_invoice_event(
         event_type: Type of event (e.g., 'IMPORT', 'EMAIL_SENT', 'REMINDER_CREATED', 'PAYMENT_RECEIVED')
         metadata: Optional dictionary with additional event details (will be stored as JSON)
     """
-    import json
-    metadata_json = json.dumps(metadata) if metadata else None
+    metadata_json = _metadata_json(metadata)
     conn.execute(
         """
         INSERT INTO invoice_history (invoice_id, event_type, metadata)
@@ -1940,6 +2609,23 @@ def log_invoice_event(
     )
 
 
+def log_invoice_events(
+    conn: sqlite3.Connection,
+    events: Iterable[tuple[int, str, Optional[dict]]]
+) -> None:
+    """Log several (invoice_id, event_type, metadata) events with one executemany."""
+    conn.executemany(
+        """
+        INSERT INTO invoice_history (invoice_id, event_type, metadata)
+        VALUES (?, ?, ?)
+        """,
+        [
+            (invoice_id, event_type, _metadata_json(metadata))
+            for invoice_id, event_type, metadata in events
+        ]
+    )
+
+
 def detect_and_log_payments(conn: sqlite3.Connection, current_snapshot_date: str) -> int:
     """
     Detect invoices that were paid (disappeared from the latest snapshot)
@@ -1986,33 +2672,31 @@ def detect_and_log_payments(conn: sqlite3.Connection, current_snapshot_date: str
     previous_snapshot_date = previous_snapshot[1]
 
     # Find invoices that were in previous snapshot but NOT in current snapshot
-    # and haven't been logged as paid yet
+    # and haven't been logged as paid yet. One anti-join pass: the LEFT JOINs
+    # probe the UNIQUE(invoice_id, snapshot_id) index and
+    # idx_invoice_history_invoice_event instead of pulling every id into Python.
     paid_invoices = conn.execute(
         """
-        SELECT DISTINCT i.id, i.invoice_number, i.customer_name, i.amount_cents
-        FROM invoices i
-        JOIN invoice_snapshots isnap_prev ON i.id = isnap_prev.invoice_id
-        WHERE isnap_prev.snapshot_id = ?
-          AND NOT EXISTS (
-              SELECT 1 FROM invoice_snapshots isnap_curr
-              WHERE isnap_curr.invoice_id = i.id
-                AND isnap_curr.snapshot_id = ?
-          )
-          AND NOT EXISTS (
-              SELECT 1 FROM invoice_history ih
-              WHERE ih.invoice_id = i.id
-                AND ih.event_type = 'PAYMENT_RECEIVED'
-          )
+        SELECT i.id, i.invoice_number, i.customer_name, i.amount_cents
+        FROM invoice_snapshots prev
+        JOIN invoices i ON i.id = prev.invoice_id
+        LEFT JOIN invoice_snapshots cur
+            ON cur.invoice_id = i.id AND cur.snapshot_id = ?
+        LEFT JOIN invoice_history h
+            ON h.invoice_id = i.id AND h.event_type = 'PAYMENT_RECEIVED'
+        WHERE prev.snapshot_id = ?
+          AND cur.invoice_id IS NULL
+          AND h.invoice_id IS NULL
+        ORDER BY i.id
         """,
-        (previous_snapshot_id, current_snapshot_id)
+        (current_snapshot_id, previous_snapshot_id)
     ).fetchall()
 
-    # Log payment event for each paid invoice
-    count = 0
+    # Log payment events for all paid invoices with one executemany
+    events = []
     for invoice in paid_invoices:
         invoice_id, invoice_number, customer_name, amount_cents = invoice
-        log_invoice_event(
-            conn,
+        events.append((
             invoice_id,
             "PAYMENT_RECEIVED",
             {
@@ -2022,8 +2706,7 @@ def detect_and_log_payments(conn: sqlite3.Connection, current_snapshot_date: str
                 "invoice_number": invoice_number or "ohne Nummer",
                 "customer_name": customer_name
             }
-        )
-        count += 1
+        ))
         logging.info(
             "Zahlung erkannt: %s (%s) – %.2f € (zuletzt gesehen: %s)",
             customer_name,
@@ -2031,25 +2714,71 @@ def detect_and_log_payments(conn: sqlite3.Connection, current_snapshot_date: str
             amount_cents / 100,
             previous_snapshot_date
         )
+    log_invoice_events(conn, events)
 
-    return count
+    return len(events)
 
 
 def storage_key(pdf_path: Path, root: Path) -> str:
     # Store paths relative to DATA_DIR (get_data_dir()) for consistency with serve_pdf route
     # Normalize Unicode to NFC for cross-platform compatibility (macOS uses NFD, Windows uses NFC)
-    data_dir = get_data_dir()
-    try:
-        relative = str(pdf_path.relative_to(data_dir))
-    except ValueError:
+    relative = _relative_to(pdf_path, get_data_dir())
+    if relative is None:
         # Fallback: if not under DATA_DIR, try relative to root
-        try:
-            relative = str(pdf_path.relative_to(root))
-        except ValueError:
+        relative = _relative_to(pdf_path, root)
+        if relative is None:
             relative = str(pdf_path.resolve())
     return unicodedata.normalize('NFC', relative)
 
 
+ParsedPdf = Tuple[Tuple[str, str], str, InvoiceRecord]
+
+
+def parse_only(pdf_path: Path, root: Path, data: Optional[bytes] = None) -> Optional[ParsedPdf]:
+    """
+    Parse a PDF without touching the database, so it can run in a worker process.
+    *data* is the file content if it was already read (see _parse_batch).
+
+    Returns ``((snapshot_date, folder_name), storage_key, record)`` or None if
+    the file is not inside a month folder.
+    """
+    snapshot_info = extract_snapshot_from_path(pdf_path, root)
+    if not snapshot_info:
+        logging.warning("Überspringe %s - nicht in einem Monatsordner (Format: YYYY-MM-...)", pdf_path)
+        return None
+
+    key = storage_key(pdf_path, root)
+    return snapshot_info, key, parse_invoice(pdf_path, key, data)
+
+
+def _parse_worker(pdf_path: Path, root: Path, data: Optional[bytes] = None) -> tuple:
+    """Worker wrapper for parse_only: returns errors instead of raising them,
+    so one broken PDF does not abort the whole executor.map()."""
+    try:
+        return pdf_path, parse_only(pdf_path, root, data), None
+    except Exception as exc:
+        return pdf_path, None, exc
+
+
+def _parse_batch(pdf_paths: list[Path], root: Path) -> list[tuple]:
+    """
+    Parse several PDFs in one worker process. All files of the batch are read
+    up front by a few reader threads (several reads in flight keep the disk
+    queue busy on cold caches) while the first ones are already decoded.
+    """
+    results = []
+    with ThreadPoolExecutor(max_workers=READ_THREADS) as reader:
+        pending_data = [reader.submit(Path.read_bytes, pdf_path) for pdf_path in pdf_paths]
+        for pdf_path, future in zip(pdf_paths, pending_data):
+            try:
+                data = future.result()
+            except OSError as exc:
+                results.append((pdf_path, None, exc))
+                continue
+            results.append(_parse_worker(pdf_path, root, data))
+    return results
+
+
 def process_pdf_file(conn: sqlite3.Connection, pdf_path: Path, root: Path) -> bool:
     """
     Process a PDF file and add it to the database with snapshot tracking.
@@ -2058,29 +2787,204 @@ def process_pdf_file(conn: sqlite3.Connection, pdf_path: Path, root: Path) -> bo
     If similar customers are found, the import is saved to pending_imports
     for user review and False is returned.
     """
+    pending = _pending_parse(conn, pdf_path, root)
+    if pending is None:
+        return False
+    snapshot_info, key, signature = pending
+
+    # Parse invoice data
+    record = parse_invoice(pdf_path, key)
+
+    is_new_link = persist(conn, (snapshot_info, key, record), commit=False)
+    store_file_signatures(conn, [(key, signature)])
+    conn.commit()
+    return is_new_link
+
+
+def process_pdf_files(
+    conn: sqlite3.Connection,
+    pdf_paths: list[Path],
+    root: Path,
+    file_signatures: Optional[dict[Path, tuple[int, int]]] = None
+) -> Iterator[tuple[Path, bool, Optional[Exception]]]:
+    """
+    process_pdf_file for many files: the files that need parsing are parsed in
+    worker processes, writing stays in this process. The parse results of
+    WRITE_BATCH_SIZE files are collected first and then written in one short
+    transaction, so the write lock is never held while waiting for a parse (or
+    for the consumer of this generator); a savepoint per file keeps a failing
+    file from taking the rest of its batch down with it. Pass *file_signatures*
+    (see find_pdfs_with_signature) to save the stat per file.
+
+    Yields ``(pdf_path, is_new_link, error)`` in the order of *pdf_paths*, one
+    batch at a time after its commit; errors are yielded instead of raised so
+    one broken PDF does not stop the scan.
+    """
+    # Files already linked and unchanged (or waiting for review) are skipped
+    # before parsing; the known keys are loaded once for the whole scan
+    known = _known_files(conn)
+    # Unchanged links from before the signature columns get theirs filled in
+    signatures: list = []
+    checks = []
+    for pdf_path in pdf_paths:
+        signature = file_signatures.get(pdf_path) if file_signatures else None
+        try:
+            checks.append(_pending_parse(conn, pdf_path, root, known, signature, signatures))
+        except Exception as exc:
+            checks.append(exc)
+    to_parse = [path for path, check in zip(pdf_paths, checks) if isinstance(check, tuple)]
+
+    executor = None
+    if len(to_parse) > PARSE_CHUNKSIZE:
+        # Worker processes only pay off beyond one batch
+        executor = ProcessPoolExecutor(max_workers=os.cpu_count())
+        batches = [to_parse[i:i + PARSE_CHUNKSIZE] for i in range(0, len(to_parse), PARSE_CHUNKSIZE)]
+        results = chain.from_iterable(executor.map(_parse_batch, batches, repeat(root)))
+    else:
+        results = iter(_parse_batch(to_parse, root))
+
+    def write_batch(batch: list) -> list:
+        """Persist the parsed files of *batch* in one transaction and return
+        the results of all its entries."""
+        outcomes = []
+        if not signatures and all(parsed is None for _, _, parsed, _ in batch):
+            return [(pdf_path, False, error) for pdf_path, _, _, error in batch]
+        import_events: list = []
+        _begin_write(conn)
+        try:
+            for pdf_path, check, parsed, error in batch:
+                if parsed is None:
+                    outcomes.append((pdf_path, False, error))
+                    continue
+                conn.execute("SAVEPOINT pdf_file")
+                file_events: list = []
+                try:
+                    is_new_link = persist(conn, parsed, commit=False, import_events=file_events)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO pdf_file")
+                    conn.execute("RELEASE pdf_file")
+                    outcomes.append((pdf_path, False, exc))
+                    continue
+                conn.execute("RELEASE pdf_file")
+                import_events.extend(file_events)
+                signatures.append((parsed[1], check[2]))
+                outcomes.append((pdf_path, is_new_link, None))
+            log_invoice_events(conn, import_events)
+            store_file_signatures(conn, signatures)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            signatures.clear()
+        return outcomes
+
+    # Entries are (pdf_path, check, parsed, error); parsed is None for files
+    # that were skipped or failed to parse
+    batch: list = []
+    try:
+        for pdf_path, check in zip(pdf_paths, checks):
+            if isinstance(check, tuple):
+                _, parsed, exc = next(results)
+                batch.append((pdf_path, check, parsed if exc is None else None, exc))
+            else:
+                batch.append((pdf_path, check, None, check))
+            if len(batch) == WRITE_BATCH_SIZE:
+                outcomes = write_batch(batch)
+                batch = []
+                yield from outcomes
+        yield from write_batch(batch)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def _known_files(conn: sqlite3.Connection) -> tuple[set[str], dict[str, tuple]]:
+    """
+    Storage keys waiting in pending_imports, and the stored (file_mtime, file_size)
+    of every linked file - loaded once per scan instead of two queries per PDF.
+    """
+    pending_keys = {row[0] for row in conn.execute("SELECT file_path FROM pending_imports")}
+    linked = {
+        row[0]: row[1:]
+        for row in conn.execute("SELECT file_path, file_mtime, file_size FROM invoice_snapshots")
+    }
+    return pending_keys, linked
+
+
+def _pending_parse(
+    conn: sqlite3.Connection,
+    pdf_path: Path,
+    root: Path,
+    known: Optional[tuple[set[str], dict[str, tuple]]] = None,
+    signature: Optional[tuple[int, int]] = None,
+    missing_signatures: Optional[list] = None
+) -> Optional[tuple[tuple[str, str], str, tuple[int, int]]]:
+    """
+    Cheap checks before parsing: returns ``(snapshot_info, storage_key, signature)``
+    if *pdf_path* has to be parsed, None if it is skipped. Pass *known* (see
+    _known_files) when checking many files, and *signature* if the file was
+    already stat'ed. Skipped links without a stored signature are appended to
+    *missing_signatures* as ``(storage_key, signature)``.
+    """
     # Extract snapshot info from path
     snapshot_info = extract_snapshot_from_path(pdf_path, root)
     if not snapshot_info:
         logging.warning("Überspringe %s - nicht in einem Monatsordner (Format: YYYY-MM-...)", pdf_path)
-        return False
-
-    snapshot_date, folder_name = snapshot_info
+        return None
 
     # Get storage key for file path
     key = storage_key(pdf_path, root)
 
     # Check if this file is already in pending_imports
-    existing_pending = conn.execute(
-        "SELECT id FROM pending_imports WHERE file_path = ?",
-        (key,)
-    ).fetchone()
+    if known is not None:
+        existing_pending = key in known[0]
+    else:
+        existing_pending = conn.execute(
+            "SELECT id FROM pending_imports WHERE file_path = ?",
+            (key,)
+        ).fetchone()
 
     if existing_pending:
         logging.debug("PDF bereits in pending_imports: %s", pdf_path)
-        return False
+        return None
 
-    # Parse invoice data
-    record = parse_invoice(pdf_path, key)
+    # Already linked to its snapshot by an earlier scan and unchanged since
+    # then - skip the expensive parse
+    if signature is None:
+        signature = _stat_signature(pdf_path.stat())
+    if known is not None:
+        already_linked = known[1].get(key)
+    else:
+        already_linked = conn.execute(
+            "SELECT file_mtime, file_size FROM invoice_snapshots WHERE file_path = ? LIMIT 1",
+            (key,)
+        ).fetchone()
+
+    if already_linked and _is_unchanged(already_linked, signature):
+        if already_linked[0] is None and missing_signatures is not None:
+            missing_signatures.append((key, signature))
+        logging.debug("Rechnung bereits in Snapshot %s: %s", snapshot_info[0], key)
+        return None
+
+    return snapshot_info, key, signature
+
+
+def persist(
+    conn: sqlite3.Connection,
+    parsed: ParsedPdf,
+    commit: bool = True,
+    import_events: Optional[list] = None
+) -> bool:
+    """
+    Write a parsed invoice (see parse_only) to the database.
+    Returns True if a new invoice-snapshot link was created.
+
+    For batch imports pass commit=False and an import_events list: the IMPORT
+    history events are then collected there (for log_invoice_events) and the
+    caller commits once at the end.
+    """
+    (snapshot_date, folder_name), key, record = parsed
 
     # Get or create snapshot
     snapshot_id = get_or_create_snapshot(conn, snapshot_date, folder_name)
@@ -2175,7 +3079,8 @@ def process_pdf_file(conn: sqlite3.Connection, pdf_path: Path, root: Path) -> bo
                     json.dumps(similar_customers),
                 )
             )
-            conn.commit()
+            if commit:
+                conn.commit()
             logging.info(
                 "Ähnlicher Kunde gefunden für '%s' - Import wartet auf Review (Score: %.1f%%)",
                 record.customer_name,
@@ -2184,7 +3089,7 @@ def process_pdf_file(conn: sqlite3.Connection, pdf_path: Path, root: Path) -> bo
             return False
         except sqlite3.IntegrityError:
             # File already in pending_imports
-            logging.debug("PDF bereits in pending_imports: %s", pdf_path)
+            logging.debug("PDF bereits in pending_imports: %s", key)
             return False
 
     # No similar customers found - proceed with normal import
@@ -2205,42 +3110,34 @@ def process_pdf_file(conn: sqlite3.Connection, pdf_path: Path, root: Path) -> bo
             {"from": auto_mapped_from, "to": record.customer_name},
         )
 
-    # Check if customer has salutation in customer_details
-    customer_check = conn.execute(
-        "SELECT salutation FROM customer_details WHERE customer_name = ?",
-        (record.customer_name,)
-    ).fetchone()
-
-    # If customer doesn't exist or has no salutation, try to determine it via AI
-    if not customer_check or not customer_check[0]:
-        salutation = determine_salutation_for_customer(record.customer_name)
-        if salutation:
-            conn.execute(
-                """
-                INSERT INTO customer_details (customer_name, salutation, updated_at)
-                VALUES (?, ?, datetime('now', 'localtime'))
-                ON CONFLICT(customer_name) DO UPDATE SET
-                    salutation = excluded.salutation,
-                    updated_at = datetime('now', 'localtime')
-                """,
-                (record.customer_name, salutation)
-            )
-            logging.info("Anrede für %s automatisch ermittelt: %s", record.customer_name, salutation)
+    # If customer doesn't exist or has no salutation, queue it for the AI lookup
+    # (network-bound, so it runs outside the import path). Check and queue in
+    # one statement: this runs once per imported PDF.
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO pending_salutations (customer_name)
+        SELECT ? WHERE NOT EXISTS (
+            SELECT 1 FROM customer_details
+            WHERE customer_name = ? AND salutation IS NOT NULL AND salutation != ''
+        )
+        """,
+        (record.customer_name, record.customer_name)
+    )
 
     # Log import event for new invoices
     if is_new_link:
-        log_invoice_event(
-            conn,
-            invoice_id,
-            "IMPORT",
-            {
-                "snapshot_date": snapshot_date,
-                "file_path": key,
-                "amount": record.amount_cents / 100
-            }
-        )
+        import_metadata = {
+            "snapshot_date": snapshot_date,
+            "file_path": key,
+            "amount": record.amount_cents / 100
+        }
+        if import_events is not None:
+            import_events.append((invoice_id, "IMPORT", import_metadata))
+        else:
+            log_invoice_event(conn, invoice_id, "IMPORT", import_metadata)
 
-    conn.commit()
+    if commit:
+        conn.commit()
 
     if is_new_link:
         logging.info(
@@ -2262,6 +3159,28 @@ class InvoiceEventHandler(FileSystemEventHandler):
         self.root = root
         self.db_path = db_path
         self.settle_seconds = max(0.0, settle_seconds)
+        # One connection for the watcher's lifetime; the lock serialises events
+        # arriving from the observer thread(s)
+        self._conn = open_conn(db_path, check_same_thread=False)
+        init_db(self._conn)
+        self._lock = threading.Lock()
+        # Debounce: every event only (re)sets the file's deadline, a single
+        # consumer thread imports it once no new event arrived for settle_seconds.
+        # The observer thread therefore never sleeps or touches the database.
+        self._deadlines: dict[Path, float] = {}
+        self._heap: list[tuple[float, Path]] = []
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._consumer = threading.Thread(target=self._consume, name="invoice-watcher", daemon=True)
+        self._consumer.start()
+
+    def close(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._consumer.join()
+        with self._lock:
+            self._conn.close()
 
     def on_created(self, event) -> None:  # type: ignore[override]
         self._handle_event(event, getattr(event, "src_path", None), event.is_directory)
@@ -2269,28 +3188,59 @@ class InvoiceEventHandler(FileSystemEventHandler):
     def on_moved(self, event) -> None:  # type: ignore[override]
         self._handle_event(event, getattr(event, "dest_path", None), event.is_directory)
 
+    def on_closed(self, event) -> None:  # type: ignore[override]
+        # IN_CLOSE_WRITE (inotify only): the writer is done, restart the settle delay
+        self._handle_event(event, getattr(event, "src_path", None), event.is_directory)
+
     def _handle_event(self, event, path_str: Optional[str], is_directory: bool) -> None:
         if is_directory or not path_str:
             return
         path = Path(path_str)
         if path.suffix.lower() != ".pdf":
             return
-        logging.info("Neue Datei erkannt: %s", path)
-        if self.settle_seconds:
-            time.sleep(self.settle_seconds)
-        with sqlite3.connect(self.db_path) as conn:
-            init_db(conn)
-            try:
-                process_pdf_file(conn, path, self.root)
-            except Exception as exc:  # pragma: no cover - watcher runtime
-                logging.error("Fehler beim Verarbeiten von %s: %s", path, exc)
+        deadline = time.monotonic() + self.settle_seconds
+        with self._cond:
+            if path not in self._deadlines:
+                logging.info("Neue Datei erkannt: %s", path)
+            self._deadlines[path] = deadline
+            heapq.heappush(self._heap, (deadline, path))
+            self._cond.notify()
+
+    def _next_due(self) -> Optional[Path]:
+        """Wait for the next file whose settle delay has passed (None once closed)."""
+        with self._cond:
+            while not self._stopped:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                deadline, path = self._heap[0]
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                heapq.heappop(self._heap)
+                # Superseded by a later event for the same file
+                if self._deadlines.get(path) != deadline:
+                    continue
+                del self._deadlines[path]
+                return path
+        return None
+
+    def _consume(self) -> None:
+        while (path := self._next_due()) is not None:
+            with self._lock:
+                try:
+                    process_pdf_file(self._conn, path, self.root)
+                except Exception as exc:  # pragma: no cover - watcher runtime
+                    self._conn.rollback()
+                    logging.error("Fehler beim Verarbeiten von %s: %s", path, exc)
 
 
-def run_watcher(root: Path, db_path: Path, settle_seconds: float) -> None:
+def run_watcher(root: Path, db_path: Path, settle_seconds: float, polling: bool = False) -> None:
     if FileSystemEventHandler is None:
         raise SystemExit("watchdog ist nicht installiert – bitte 'pip install watchdog' ausführen.")
     handler = InvoiceEventHandler(root, db_path, settle_seconds)
-    observer = start_observer(handler, root)
+    observer = start_observer(handler, root, polling)
     logging.info("Watcher gestartet. Mit Strg+C beenden.")
     try:
         while True:
@@ -2300,14 +3250,17 @@ def run_watcher(root: Path, db_path: Path, settle_seconds: float) -> None:
     finally:
         observer.stop()
         observer.join()
+        handler.close()
 
 
-def start_observer(handler, root: Path):
+def start_observer(handler, root: Path, polling: bool = False):
+    # Native events first (inotify on Linux, FSEvents/kqueue, ReadDirectoryChangesW);
+    # the PollingObserver stats the whole tree every interval and is only the fallback
     observer_classes = []
+    if Observer is not None and not polling:
+        observer_classes.append(Observer)
     if PollingObserver is not None:
         observer_classes.append(PollingObserver)
-    if Observer is not None:
-        observer_classes.append(Observer)
     if not observer_classes:
         raise SystemExit("Kein verfügbarer Watchdog-Observer gefunden.")
 
@@ -2317,8 +3270,7 @@ def start_observer(handler, root: Path):
         try:
             observer.schedule(handler, str(root), recursive=True)
             observer.start()
-            if cls.__name__ != "Observer":
-                logging.info("Nutze %s für Dateibeobachtung.", cls.__name__)
+            logging.info("Nutze %s für Dateibeobachtung.", type(observer).__name__)
             return observer
         except Exception as exc:  # pragma: no cover - platform-specific
             last_error = exc
@@ -2337,38 +3289,45 @@ def main() -> None:
     db_path = args.database.resolve()
     db_path.parent.mkdir(parents=True, exist_ok=True)
 
-    pdf_files = list(find_pdfs(root))
+    pdf_files = find_pdfs_with_signature(root)
     if not pdf_files:
         logging.warning("Keine PDF-Dateien unter %s gefunden.", root)
         return
 
     new_entries = 0
     skipped_storno = 0
-    with sqlite3.connect(db_path) as conn:
+    # Salutations are looked up in the background while the import runs
+    stop_salutations = threading.Event()
+    salutation_thread = threading.Thread(
+        target=salutation_worker, args=(db_path, stop_salutations), daemon=True
+    )
+    # Same batch import as the web scan: parsing in worker processes, one
+    # savepoint per file and a commit every WRITE_BATCH_SIZE files
+    with open_conn(db_path) as conn:
         init_db(conn)
-        for pdf_path in pdf_files:
-            try:
-                if process_pdf_file(conn, pdf_path, root):
+        salutation_thread.start()
+        file_signatures = dict(pdf_files)
+        for pdf_path, is_new_link, exc in process_pdf_files(conn, list(file_signatures), root, file_signatures):
+            if exc is None:
+                if is_new_link:
                     new_entries += 1
-            except ValueError as exc:
-                # Check if this is a Stornobeleg
-                if "Stornobeleg" in str(exc):
-                    logging.debug("Überspringe Stornobeleg: %s", pdf_path.name)
-                    skipped_storno += 1
-                else:
-                    logging.error("Kann %s nicht verarbeiten: %s", pdf_path, exc)
-                continue
-            except Exception as exc:
+            # Check if this is a Stornobeleg
+            elif isinstance(exc, ValueError) and "Stornobeleg" in str(exc):
+                logging.debug("Überspringe Stornobeleg: %s", pdf_path.name)
+                skipped_storno += 1
+            else:
                 logging.error("Kann %s nicht verarbeiten: %s", pdf_path, exc)
-                continue
-        conn.commit()
 
     logging.info("Fertig. %s neue Rechnungen gespeichert.", new_entries)
     if skipped_storno > 0:
         logging.info("%s Stornobelege übersprungen.", skipped_storno)
 
-    if args.watch:
-        run_watcher(root, db_path, args.settle_seconds)
+    try:
+        if args.watch:
+            run_watcher(root, db_path, args.settle_seconds, args.polling)
+    finally:
+        stop_salutations.set()
+        salutation_thread.join()
 
 
 if __name__ == "__main__":
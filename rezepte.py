@@ -39,6 +39,7 @@ from pypdf import PdfReader, PdfWriter, PageObject, Transformation
 
 from config import get_data_dir
 from data_access import fetch_all_customers
+from invoice_tracker import open_conn
 
 # Wurzelordner fuer alle Rezept-Scans (relativ zu DATA_DIR)
 REZEPTE_DIRNAME = "Rezepte"
@@ -411,7 +412,7 @@ def billing_month_for_invoices(conn, invoice_ids) -> Optional[str]:
 # DB-Verbindung im Request-Kontext
 # --------------------------------------------------------------------------- #
 def _connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(current_app.config["DATABASE"])
+    conn = open_conn(current_app.config["DATABASE"])
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
     return conn
@@ -135,6 +135,7 @@ restore_backup() {
 
     echo -e "${YELLOW}Wiederherstellen von: $BACKUP_DIR${NC}"
     echo -e "${RED}Dies überschreibt aktuelle Dateien!${NC}"
+    echo -e "${YELLOW}Bitte vorher die Web-App beenden.${NC}"
     read -p "Fortfahren? (j/n): " confirm
 
     if [ "$confirm" != "j" ]; then
@@ -149,7 +150,17 @@ restore_backup() {
     # Dateien wiederherstellen
     echo -e "${YELLOW}Stelle Dateien wieder her...${NC}"
     cp -v "${BACKUP_PATH}"/*.py . 2>/dev/null
-    cp -v "${BACKUP_PATH}"/*.db . 2>/dev/null
+    # Zu einer wiederhergestellten .db passen keine alten WAL-Dateien (der
+    # WAL-Modus hält frische Daten in "<db>-wal"): vorher löschen, sonst wird
+    # die Datenbank beim nächsten Öffnen beschädigt. Die Web-App muss dafür
+    # beendet sein.
+    for db in "${BACKUP_PATH}"/*.db; do
+        if [ -f "$db" ]; then
+            name=$(basename "$db")
+            rm -f "${name}-wal" "${name}-shm"
+            cp -v "$db" .
+        fi
+    done
     cp -v "${BACKUP_PATH}"/*.sh . 2>/dev/null
     cp -v "${BACKUP_PATH}"/*.bat . 2>/dev/null
 
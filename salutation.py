@@ -13,6 +13,9 @@ from typing import Optional
 
 import requests
 
+# Same Nebius session (and connection pool) as the import in invoice_tracker
+from invoice_tracker import _SESSION, lookup_known_gender
+
 
 def extract_first_name(customer_name: str) -> Optional[str]:
     """
@@ -56,6 +59,8 @@ def extract_first_name(customer_name: str) -> Optional[str]:
 def determine_gender_via_ai(first_name: str) -> Optional[str]:
     """
     Use Nebius AI (Meta Llama 70B) to determine the gender based on first name.
+    Names found by lookup_known_gender (known names, first-name dictionary)
+    are answered without a request.
 
     Args:
         first_name: The first name to analyze
@@ -63,6 +68,10 @@ def determine_gender_via_ai(first_name: str) -> Optional[str]:
     Returns:
         "Herr" for male, "Frau" for female, or None if uncertain
     """
+    known = lookup_known_gender(first_name)
+    if known:
+        return known
+
     try:
         api_key = os.getenv('NEBIUS_API_KEY')
         if not api_key:
@@ -98,7 +107,7 @@ Antwort:"""
             "max_tokens": 10
         }
 
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
+        response = _SESSION.post(url, headers=headers, json=payload, timeout=10)
         response.raise_for_status()
 
         data = response.json()
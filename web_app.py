@@ -17,6 +17,8 @@ from datetime import datetime, date, timedelta
 from pathlib import Path
 from typing import Iterable, List, Optional, Dict, Tuple, Any
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 import os
 import smtplib
 import imaplib
@@ -59,18 +61,27 @@ from reportlab.platypus import Paragraph
 from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.enums import TA_JUSTIFY
 from invoice_tracker import (
+    AI_BATCH_WORKERS,
     find_pdfs,
     find_pdfs_for_import,
     get_completed_folders,
     mark_folder_complete,
     mark_folder_incomplete,
     init_db,
-    process_pdf_file,
+    open_conn,
+    process_pdf_files,
+    drain_pending_salutations,
     log_invoice_event,
+    log_invoice_events,
     resolve_pending_import,
+    resolve_pending_imports_bulk,
     save_import_mapping,
     determine_genders_batch_via_ai,
-    validate_customer_names_batch_via_ai,
+    ask_name_validity_via_ai,
+    load_cached_genders,
+    store_cached_genders,
+    load_cached_name_validity,
+    store_cached_name_validity,
 )
 from salutation import (
     extract_first_name,
@@ -150,6 +161,17 @@ from data_access import (
 )
 
 
+# Einmal kompiliert statt bei jedem Aufruf bzw. jeder Kundenzeile
+_PARENS_RE = regex_module.compile(r"[()]")
+_MULTISPACE_RE = regex_module.compile(r"\s+")
+_SNAPSHOT_FOLDER_RE = regex_module.compile(r"^\d{4}-\d{2}")
+
+
+def _without_parens(name: str) -> str:
+    """Customer name without parentheses and with collapsed spaces (as in filenames)."""
+    return _MULTISPACE_RE.sub(" ", _PARENS_RE.sub("", name).strip())
+
+
 def create_app(config: Optional[dict] = None) -> Flask:
     app = Flask(__name__)
     app.config.from_mapping(
@@ -181,7 +203,8 @@ def create_app(config: Optional[dict] = None) -> Flask:
         logging.getLogger().addHandler(file_handler)
 
     # Initialize database tables if they don't exist
-    conn = sqlite3.connect(app.config["DATABASE"])
+    # open_conn switches the database to WAL once (persistent for all later connections)
+    conn = open_conn(app.config["DATABASE"])
     init_db(conn)
     init_rezepte_schema(conn)
     conn.commit()
@@ -192,7 +215,6 @@ def create_app(config: Optional[dict] = None) -> Flask:
     def german_date_filter(iso_date: str) -> str:
         """Convert ISO date (YYYY-MM-DD) to German format (DD.MM.YYYY)."""
         try:
-            from datetime import datetime
             dt = datetime.strptime(iso_date, "%Y-%m-%d")
             return dt.strftime("%d.%m.%Y")
         except (ValueError, TypeError):
@@ -224,7 +246,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
     @app.route("/")
     def dashboard() -> Response:
         """Statistics dashboard - overview page with invoice statistics."""
-        conn = sqlite3.connect(app.config["DATABASE"])
+        conn = open_conn(app.config["DATABASE"])
         conn.row_factory = sqlite3.Row
 
         try:
@@ -488,7 +510,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
         # Fetch LetterXpress status from database
         letterxpress_status = {}
         try:
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 conn.row_factory = sqlite3.Row
                 rows = conn.execute(
                     """SELECT pdf_path, letterxpress_job_id, mode, submitted_at,
@@ -758,7 +780,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
             lx = LetterXpressClient()
             checked = registered = delivered = errors = not_found = 0
             now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 conn.row_factory = sqlite3.Row
                 rows = conn.execute(
                     """SELECT id, letterxpress_job_id
@@ -841,7 +863,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
         has_custom_fields = "custom_name" in data
 
         try:
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 init_db(conn)
 
                 if has_custom_fields:
@@ -926,7 +948,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
     def determine_salutations() -> Response:
         """Automatically determine salutations for all customers without salutation using AI."""
         try:
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 conn.row_factory = sqlite3.Row
                 init_db(conn)
 
@@ -999,7 +1021,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
         """
         def generate():
             try:
-                with sqlite3.connect(app.config["DATABASE"]) as conn:
+                with open_conn(app.config["DATABASE"]) as conn:
                     conn.row_factory = sqlite3.Row
                     init_db(conn)
 
@@ -1045,38 +1067,48 @@ def create_app(config: Optional[dict] = None) -> Flask:
                     empty_batches = 0  # batches where the AI returned no usable result
                     total_batches = 0
 
-                    for i in range(0, len(first_names), batch_size):
-                        batch = first_names[i:i + batch_size]
-                        total_batches += 1
-
-                        yield f"data: {json.dumps({'type': 'progress', 'processed': processed, 'total': total, 'batch': batch})}\n\n"
-
-                        # Call batch AI
-                        results = determine_genders_batch_via_ai(batch)
-                        if not any(results.values()):
-                            empty_batches += 1
-
-                        # Update database for each result
-                        for first_name, salutation in results.items():
-                            if salutation and first_name in name_to_customer:
-                                for customer_name in name_to_customer[first_name]:
-                                    conn.execute(
-                                        """
-                                        INSERT INTO customer_details (customer_name, salutation, updated_at)
-                                        VALUES (?, ?, datetime('now', 'localtime'))
-                                        ON CONFLICT(customer_name) DO UPDATE SET
-                                            salutation = excluded.salutation,
-                                            updated_at = datetime('now', 'localtime')
-                                        """,
-                                        (customer_name, salutation)
-                                    )
-                                    success_count += 1
-                                    processed += 1
-                            else:
-                                if first_name in name_to_customer:
-                                    processed += len(name_to_customer[first_name])
+                    # First names answered in earlier runs come from the cache and
+                    # are applied like one extra batch; only the rest goes to the AI.
+                    # The AI requests of several batches overlap; results are
+                    # consumed in order, so progress is reported as before
+                    cached = load_cached_genders(conn, first_names)
+                    to_ask = [name for name in first_names if name not in cached]
+                    ai_batches = [to_ask[i:i + batch_size] for i in range(0, len(to_ask), batch_size)]
+                    with ThreadPoolExecutor(max_workers=AI_BATCH_WORKERS) as executor:
+                        batches = zip(ai_batches, executor.map(determine_genders_batch_via_ai, ai_batches))
+                        if cached:
+                            batches = chain([(list(cached), cached)], batches)
+                        for batch, results in batches:
+                            total_batches += 1
+                            if results is not cached:
+                                store_cached_genders(conn, results)
+
+                            yield f"data: {json.dumps({'type': 'progress', 'processed': processed, 'total': total, 'batch': batch})}\n\n"
+
+                            if not any(results.values()):
+                                empty_batches += 1
+
+                            # Update database for each result
+                            for first_name, salutation in results.items():
+                                if salutation and first_name in name_to_customer:
+                                    for customer_name in name_to_customer[first_name]:
+                                        conn.execute(
+                                            """
+                                            INSERT INTO customer_details (customer_name, salutation, updated_at)
+                                            VALUES (?, ?, datetime('now', 'localtime'))
+                                            ON CONFLICT(customer_name) DO UPDATE SET
+                                                salutation = excluded.salutation,
+                                                updated_at = datetime('now', 'localtime')
+                                            """,
+                                            (customer_name, salutation)
+                                        )
+                                        success_count += 1
+                                        processed += 1
+                                else:
+                                    if first_name in name_to_customer:
+                                        processed += len(name_to_customer[first_name])
 
-                        conn.commit()
+                            conn.commit()
 
                     # If every batch came back empty the AI is most likely
                     # unreachable (e.g. invalid/expired NEBIUS_API_KEY) rather
@@ -1101,7 +1133,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
         """
         def generate():
             try:
-                with sqlite3.connect(app.config["DATABASE"]) as conn:
+                with open_conn(app.config["DATABASE"]) as conn:
                     conn.row_factory = sqlite3.Row
                     init_db(conn)
 
@@ -1147,41 +1179,49 @@ def create_app(config: Optional[dict] = None) -> Flask:
                     flagged_count = 0
                     processed = 0
 
-                    for i in range(0, len(customer_names), batch_size):
-                        batch = customer_names[i:i + batch_size]
-
-                        yield f"data: {json.dumps({'type': 'progress', 'processed': processed, 'total': total, 'batch': batch})}\n\n"
-
-                        # Call batch AI validation
-                        results = validate_customer_names_batch_via_ai(batch)
-
-                        # Update database for each result
-                        for name, is_valid in results.items():
-                            if not is_valid:
-                                # Name is invalid - flag it
-                                conn.execute(
-                                    """
-                                    UPDATE invoices
-                                    SET name_needs_review = 1
-                                    WHERE customer_name = ?
-                                    """,
-                                    (name,)
-                                )
-                                flagged_count += 1
-                                logging.info(f"Flagged invalid name: {name}")
-                            else:
-                                # Name is valid - mark as checked (0 = validated OK)
-                                conn.execute(
-                                    """
-                                    UPDATE invoices
-                                    SET name_needs_review = 0
-                                    WHERE customer_name = ?
-                                    """,
-                                    (name,)
-                                )
-                            processed += 1
+                    # Names judged in earlier runs come from the cache (applied like
+                    # one extra batch); names the AI could not judge count as valid
+                    cached = load_cached_name_validity(conn, customer_names)
+                    to_ask = [name for name in customer_names if name not in cached]
+                    ai_batches = [to_ask[i:i + batch_size] for i in range(0, len(to_ask), batch_size)]
+                    with ThreadPoolExecutor(max_workers=AI_BATCH_WORKERS) as executor:
+                        batches = zip(ai_batches, executor.map(ask_name_validity_via_ai, ai_batches))
+                        if cached:
+                            batches = chain([(list(cached), cached)], batches)
+                        for batch, batch_verdicts in batches:
+                            if batch_verdicts is not cached:
+                                store_cached_name_validity(conn, batch_verdicts)
+                            results = {name: batch_verdicts.get(name, True) for name in batch}
+
+                            yield f"data: {json.dumps({'type': 'progress', 'processed': processed, 'total': total, 'batch': batch})}\n\n"
+
+                            # Update database for each result
+                            for name, is_valid in results.items():
+                                if not is_valid:
+                                    # Name is invalid - flag it
+                                    conn.execute(
+                                        """
+                                        UPDATE invoices
+                                        SET name_needs_review = 1
+                                        WHERE customer_name = ?
+                                        """,
+                                        (name,)
+                                    )
+                                    flagged_count += 1
+                                    logging.info(f"Flagged invalid name: {name}")
+                                else:
+                                    # Name is valid - mark as checked (0 = validated OK)
+                                    conn.execute(
+                                        """
+                                        UPDATE invoices
+                                        SET name_needs_review = 0
+                                        WHERE customer_name = ?
+                                        """,
+                                        (name,)
+                                    )
+                                processed += 1
 
-                        conn.commit()
+                            conn.commit()
 
                     yield f"data: {json.dumps({'type': 'complete', 'total': total, 'flagged': flagged_count, 'message': f'{flagged_count} Namen zur Prüfung markiert'})}\n\n"
 
@@ -1236,7 +1276,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
         total_amount = sum(row.amount_eur for row in invoices)
 
         # Get latest snapshot and date range for display
-        with sqlite3.connect(app.config["DATABASE"]) as conn:
+        with open_conn(app.config["DATABASE"]) as conn:
             latest_snapshot_row = conn.execute(
                 "SELECT MAX(snapshot_date) as latest FROM snapshots"
             ).fetchone()
@@ -1314,7 +1354,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
         customer_always_rx = {}
         rx_selections = {}  # {(filename, month): True}
         try:
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 conn.row_factory = sqlite3.Row
                 init_db(conn)  # Ensure new table exists
                 rows = conn.execute(
@@ -1342,38 +1382,28 @@ def create_app(config: Optional[dict] = None) -> Flask:
                 for row in customer_rows:
                     # Store both original name and normalized version (without parentheses)
                     # because filenames may have parentheses removed
-                    import re
                     name = row["customer_name"]
                     customer_print_only[name] = True
                     # Also store version without parentheses
-                    name_no_parens = re.sub(r'[()]', '', name).strip()
-                    name_no_parens = re.sub(r'\s+', ' ', name_no_parens)  # collapse multiple spaces
-                    customer_print_only[name_no_parens] = True
+                    customer_print_only[_without_parens(name)] = True
                     # Also check custom_name if set
                     if row["custom_name"]:
                         customer_print_only[row["custom_name"]] = True
-                        custom_no_parens = re.sub(r'[()]', '', row["custom_name"]).strip()
-                        custom_no_parens = re.sub(r'\s+', ' ', custom_no_parens)
-                        customer_print_only[custom_no_parens] = True
+                        customer_print_only[_without_parens(row["custom_name"])] = True
 
                 # Fetch always_rx status for all customers
                 always_rx_rows = conn.execute(
                     "SELECT customer_name, custom_name, always_rx FROM customer_details WHERE always_rx = 1"
                 ).fetchall()
                 for row in always_rx_rows:
-                    import re
                     name = row["customer_name"]
                     customer_always_rx[name] = True
                     # Also store version without parentheses
-                    name_no_parens = re.sub(r'[()]', '', name).strip()
-                    name_no_parens = re.sub(r'\s+', ' ', name_no_parens)
-                    customer_always_rx[name_no_parens] = True
+                    customer_always_rx[_without_parens(name)] = True
                     # Also check custom_name if set
                     if row["custom_name"]:
                         customer_always_rx[row["custom_name"]] = True
-                        custom_no_parens = re.sub(r'[()]', '', row["custom_name"]).strip()
-                        custom_no_parens = re.sub(r'\s+', ' ', custom_no_parens)
-                        customer_always_rx[custom_no_parens] = True
+                        customer_always_rx[_without_parens(row["custom_name"])] = True
 
                 # Fetch rX selections
                 rx_rows = conn.execute(
@@ -1550,19 +1580,19 @@ def create_app(config: Optional[dict] = None) -> Flask:
         payments_detected = 0
         pdf_count = 0
 
-        with sqlite3.connect(db_path) as conn:
+        with open_conn(db_path) as conn:
             init_db(conn)
             # Use find_pdfs_for_import to skip already completed folders
             pdf_files = list(find_pdfs_for_import(root, conn))
             pdf_count = len(pdf_files)
-            for pdf_path in pdf_files:
-                try:
-                    if process_pdf_file(conn, pdf_path, root):
-                        new_count += 1
-                except Exception as exc:
+            # PDFs are parsed in worker processes, results arrive in file order
+            for pdf_path, is_new, exc in process_pdf_files(conn, pdf_files, root):
+                if exc is not None:
                     error_msg = f"{pdf_path.name}: {str(exc)}"
                     errors.append(error_msg)
                     logging.error("Fehler beim Verarbeiten von %s: %s", pdf_path, exc)
+                elif is_new:
+                    new_count += 1
             conn.commit()
 
             # After scanning, detect and log payments for the latest snapshot
@@ -1580,6 +1610,12 @@ def create_app(config: Optional[dict] = None) -> Flask:
             except Exception as e:
                 logging.error(f"Fehler bei Zahlungserkennung: {e}")
 
+            # Determine salutations queued during the scan
+            try:
+                drain_pending_salutations(conn)
+            except Exception as e:
+                logging.error(f"Fehler bei Anredeermittlung: {e}")
+
         return jsonify({
             "success": True,
             "new_invoices": new_count,
@@ -1591,9 +1627,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
     @app.route("/api/scan-stream", methods=["GET"])
     def scan_new_invoices_stream() -> Response:
         """Scan the invoice directory for new PDFs with real-time progress using Server-Sent Events."""
-        import json
         import re
-        from flask import stream_with_context
 
         def generate():
             try:
@@ -1604,7 +1638,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
                     yield f"data: {json.dumps({'type': 'error', 'message': f'Verzeichnis {root} nicht gefunden'})}\n\n"
                     return
 
-                with sqlite3.connect(db_path) as conn:
+                with open_conn(db_path) as conn:
                     init_db(conn)
 
                     # Use optimized function that skips already completed folders
@@ -1630,24 +1664,26 @@ def create_app(config: Optional[dict] = None) -> Flask:
                     errors = []
                     processed_folders = set()  # Track which folders we processed
 
-                    for idx, pdf_path in enumerate(pdf_files, 1):
-                        try:
-                            # Track folder
-                            relative_path = pdf_path.relative_to(root)
-                            if len(relative_path.parts) >= 1:
-                                processed_folders.add(relative_path.parts[0])
+                    # PDFs are parsed in worker processes, results arrive in file order
+                    results = process_pdf_files(conn, pdf_files, root)
+                    for idx, (pdf_path, is_new, exc) in enumerate(results, 1):
+                        # Track folder
+                        relative_path = pdf_path.relative_to(root)
+                        if len(relative_path.parts) >= 1:
+                            processed_folders.add(relative_path.parts[0])
 
-                            # Yield progress
-                            progress = int((idx / total_pdfs) * 100)
-                            yield f"data: {json.dumps({'type': 'progress', 'progress': progress, 'processed': idx, 'total': total_pdfs, 'file': pdf_path.name})}\n\n"
+                        # Yield progress
+                        progress = int((idx / total_pdfs) * 100)
+                        yield f"data: {json.dumps({'type': 'progress', 'progress': progress, 'processed': idx, 'total': total_pdfs, 'file': pdf_path.name})}\n\n"
 
-                            if process_pdf_file(conn, pdf_path, root):
+                        if exc is None:
+                            if is_new:
                                 new_count += 1
                                 yield f"data: {json.dumps({'type': 'success', 'file': pdf_path.name})}\n\n"
                             else:
                                 skipped_count += 1
                                 yield f"data: {json.dumps({'type': 'skipped', 'file': pdf_path.name})}\n\n"
-                        except Exception as exc:
+                        else:
                             error_count += 1
                             error_msg = f"{pdf_path.name}: {str(exc)}"
                             errors.append(error_msg)
@@ -1664,6 +1700,8 @@ def create_app(config: Optional[dict] = None) -> Flask:
 
                         if latest_snapshot:
                             payments_detected = detect_and_log_payments(conn, latest_snapshot[0])
+                            # Commit before yielding: the write lock must not wait on the client
+                            conn.commit()
                             if payments_detected > 0:
                                 yield f"data: {json.dumps({'type': 'info', 'message': f'{payments_detected} Zahlung(en) erkannt und in Historie eingetragen'})}\n\n"
                                 logging.info(f"Zahlungserkennung: {payments_detected} Rechnung(en) als bezahlt markiert")
@@ -1671,6 +1709,12 @@ def create_app(config: Optional[dict] = None) -> Flask:
                     except Exception as e:
                         logging.error(f"Fehler bei Zahlungserkennung: {e}")
 
+                    # Determine salutations queued during the scan
+                    try:
+                        drain_pending_salutations(conn)
+                    except Exception as e:
+                        logging.error(f"Fehler bei Anredeermittlung: {e}")
+
                     # Mark all processed folders as complete (regardless of pending imports)
                     # This ensures folders are not re-scanned on subsequent imports
                     marked_complete = []
@@ -1700,7 +1744,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
         """Get all pending imports that need user review."""
         db_path = Path(app.config["DATABASE"])
 
-        with sqlite3.connect(db_path) as conn:
+        with open_conn(db_path) as conn:
             cursor = conn.execute(
                 """
                 SELECT id, file_path, invoice_number, invoice_date,
@@ -1764,7 +1808,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
         db_path = Path(app.config["DATABASE"])
 
         try:
-            with sqlite3.connect(db_path) as conn:
+            with open_conn(db_path) as conn:
                 init_db(conn)
                 success = resolve_pending_import(conn, import_id, action, selected_customer, use_new_data)
 
@@ -1786,12 +1830,57 @@ def create_app(config: Optional[dict] = None) -> Flask:
             logging.error(f"Fehler beim Auflösen des Imports: {e}")
             return jsonify({"error": str(e)}), 500
 
+    @app.route("/api/resolve-imports", methods=["POST"])
+    def resolve_imports() -> Response:
+        """Resolve several pending imports at once (one transaction, one salutation lookup)."""
+        data = request.get_json()
+        items = data.get("resolutions") or []
+
+        resolutions = []
+        for item in items:
+            import_id = item.get("import_id")
+            action = item.get("action")
+            selected_customer = item.get("selected_customer")
+
+            if not import_id or action not in ['create_new', 'merge_with_existing']:
+                return jsonify({"error": "Jeder Eintrag braucht import_id und action ('create_new' oder 'merge_with_existing')"}), 400
+
+            if action == 'merge_with_existing' and not selected_customer:
+                return jsonify({"error": "selected_customer ist erforderlich für merge_with_existing"}), 400
+
+            resolutions.append((import_id, action, selected_customer, item.get("use_new_data", False)))
+
+        if not resolutions:
+            return jsonify({"error": "resolutions ist erforderlich"}), 400
+
+        db_path = Path(app.config["DATABASE"])
+
+        try:
+            with open_conn(db_path) as conn:
+                init_db(conn)
+                resolved_ids = resolve_pending_imports_bulk(conn, resolutions)
+
+                remaining_count = conn.execute(
+                    "SELECT COUNT(*) FROM pending_imports WHERE status = 'pending'"
+                ).fetchone()[0]
+
+            return jsonify({
+                "success": True,
+                "resolved": resolved_ids,
+                "failed": [r[0] for r in resolutions if r[0] not in resolved_ids],
+                "remaining_pending": remaining_count
+            })
+
+        except Exception as e:
+            logging.error(f"Fehler beim Auflösen der Imports: {e}")
+            return jsonify({"error": str(e)}), 500
+
     @app.route("/api/auto-mapped", methods=["GET"])
     def get_auto_mapped() -> Response:
         """List invoices that were auto-assigned via a saved mapping and still
         await the user's one-time confirmation (the review list)."""
         db_path = Path(app.config["DATABASE"])
-        with sqlite3.connect(db_path) as conn:
+        with open_conn(db_path) as conn:
             conn.row_factory = sqlite3.Row
             rows = conn.execute(
                 """
@@ -1826,7 +1915,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
         confirm_all = data.get("all", False)
         db_path = Path(app.config["DATABASE"])
         try:
-            with sqlite3.connect(db_path) as conn:
+            with open_conn(db_path) as conn:
                 if confirm_all:
                     cur = conn.execute("UPDATE invoices SET auto_mapped = 0 WHERE auto_mapped = 1")
                 elif ids:
@@ -1853,7 +1942,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
             return jsonify({"error": "id erforderlich"}), 400
         db_path = Path(app.config["DATABASE"])
         try:
-            with sqlite3.connect(db_path) as conn:
+            with open_conn(db_path) as conn:
                 row = conn.execute(
                     "SELECT mapped_from FROM invoices WHERE id = ?", (invoice_id,)
                 ).fetchone()
@@ -1882,7 +1971,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
         db_path = Path(app.config["DATABASE"])
         root = Path(app.config["INVOICE_ROOT"])
 
-        with sqlite3.connect(db_path) as conn:
+        with open_conn(db_path) as conn:
             init_db(conn)
 
             # Get folders from database
@@ -1915,9 +2004,8 @@ def create_app(config: Optional[dict] = None) -> Flask:
 
             # Also find folders on disk that aren't in the database yet
             if root.exists():
-                import re
                 for folder in root.iterdir():
-                    if folder.is_dir() and re.match(r'^\d{4}-\d{2}', folder.name):
+                    if folder.is_dir() and _SNAPSHOT_FOLDER_RE.match(folder.name):
                         if not any(f["folder_name"] == folder.name for f in folders):
                             pdf_count = len(list(folder.glob("*.pdf")))
                             folders.append({
@@ -1950,7 +2038,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
 
         db_path = Path(app.config["DATABASE"])
 
-        with sqlite3.connect(db_path) as conn:
+        with open_conn(db_path) as conn:
             init_db(conn)
             success = mark_folder_complete(conn, folder_name)
 
@@ -1975,7 +2063,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
 
         db_path = Path(app.config["DATABASE"])
 
-        with sqlite3.connect(db_path) as conn:
+        with open_conn(db_path) as conn:
             init_db(conn)
             success = mark_folder_incomplete(conn, folder_name)
 
@@ -2052,9 +2140,6 @@ def create_app(config: Optional[dict] = None) -> Flask:
     @app.route("/api/preview-invoices-email", methods=["GET"])
     def preview_invoices_email() -> Response:
         """Preview what emails would be sent (DRY RUN - no actual sending)."""
-        import json
-        from datetime import datetime
-
         query = request.args.get("q", "").strip()
         limit = clamp_limit(request.args.get("limit"), app.config["MAX_LIMIT"])
         time_filter = request.args.get("time", "all")
@@ -2080,7 +2165,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
 
             previews = []
 
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 conn.row_factory = sqlite3.Row
                 init_db(conn)
 
@@ -2228,9 +2313,6 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
     @app.route("/api/send-invoices-email-stream", methods=["GET"])
     def send_invoices_email_stream() -> Response:
         """Send invoices via email with real-time progress updates using Server-Sent Events."""
-        import json
-        from flask import stream_with_context
-
         query = request.args.get("q", "").strip()
         limit = clamp_limit(request.args.get("limit"), app.config["MAX_LIMIT"])
         time_filter = request.args.get("time", "all")
@@ -2310,7 +2392,7 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
                     smtp_connection_failed = True
 
                 # Get customer emails from database
-                with sqlite3.connect(app.config["DATABASE"]) as conn:
+                with open_conn(app.config["DATABASE"]) as conn:
                     conn.row_factory = sqlite3.Row
                     init_db(conn)
 
@@ -2479,9 +2561,8 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
                                 success_count += len(pdf_paths)
                                 sent_in_session += 1
                                 # Log email sent event for each invoice
-                                for invoice in invoice_list:
-                                    log_invoice_event(
-                                        conn,
+                                log_invoice_events(conn, (
+                                    (
                                         invoice.id,
                                         "EMAIL_SENT",
                                         {
@@ -2490,6 +2571,8 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
                                             "pdf_count": len(pdf_paths)
                                         }
                                     )
+                                    for invoice in invoice_list
+                                ))
                                 conn.commit()
                                 yield f"data: {json.dumps({'type': 'success', 'customer': customer_name, 'email': customer_email, 'count': len(pdf_paths)})}\n\n"
                                 yield f"data: {json.dumps({'type': 'status', 'message': f'✓ E-Mail erfolgreich versendet an {customer_email} ({processed_groups + 1}/{total_groups})'})}\n\n"
@@ -2538,7 +2621,7 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
             return jsonify({"success": False, "error": "Ungültige reminder_level (muss 0, 1 oder 2 sein)"}), 400
 
         try:
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 # Ensure reminders table exists
                 init_db(conn)
 
@@ -2605,7 +2688,7 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
             created_reminders = 0
             skipped_paid_invoices = 0
 
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 # Ensure reminders table exists
                 init_db(conn)
 
@@ -2913,7 +2996,7 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
                 customer_invoices[invoice.customer_name].append(invoice)
 
             # Get customer details from database
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 conn.row_factory = sqlite3.Row
                 init_db(conn)
 
@@ -2949,7 +3032,7 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
                             f"""
                             SELECT
                                 i.id, i.customer_name, i.invoice_number, i.invoice_date,
-                                CAST(i.amount_cents AS REAL) / 100.0 as amount_eur,
+                                i.amount_cents,
                                 'open' as status, i.customer_address,
                                 isna.file_path
                             FROM invoices i
@@ -2967,7 +3050,7 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
                                 customer_name=row["customer_name"],
                                 invoice_number=row["invoice_number"],
                                 invoice_date=row["invoice_date"],
-                                amount_cents=int(row["amount_eur"] * 100),
+                                amount_cents=row["amount_cents"],
                                 status=row["status"],
                                 customer_address=row["customer_address"] or "",
                                 file_path=row["file_path"],
@@ -3182,7 +3265,7 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
     def get_form_usage_history() -> Response:
         """Get the last 2 usage months for each form type (email_consent, sepa_mandate)."""
         try:
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 conn.row_factory = sqlite3.Row
                 init_db(conn)
 
@@ -3233,7 +3316,7 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
 
             candidates_by_customer = {}
 
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 conn.row_factory = sqlite3.Row
                 init_db(conn)
 
@@ -3475,7 +3558,7 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
             filename = unicodedata.normalize('NFC', filename)
 
             invoices_logged = 0
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 init_db(conn)
                 if selected:
                     conn.execute(
@@ -3502,12 +3585,12 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
                 ).fetchall()
 
                 event_type = "RX_MARKED" if selected else "RX_UNMARKED"
-                for row in invoice_rows:
-                    log_invoice_event(conn, row["invoice_id"], event_type, {
-                        "collective_invoice": filename,
-                        "month": month
-                    })
-                    invoices_logged += 1
+                metadata = {"collective_invoice": filename, "month": month}
+                log_invoice_events(
+                    conn,
+                    ((row["invoice_id"], event_type, metadata) for row in invoice_rows)
+                )
+                invoices_logged += len(invoice_rows)
 
                 conn.commit()
 
@@ -3533,7 +3616,7 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
             if not sammelrechnungen_dir.exists():
                 return jsonify({"success": False, "error": f"Verzeichnis für {month} nicht gefunden"}), 404
 
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 conn.row_factory = sqlite3.Row
                 init_db(conn)
                 rows = conn.execute(
@@ -3667,7 +3750,7 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
 
                     # Save to database
                     try:
-                        with sqlite3.connect(app.config["DATABASE"]) as db_conn:
+                        with open_conn(app.config["DATABASE"]) as db_conn:
                             # Extract month and customer name from filename
                             # Format: Sammelrechnung_2025-11_CustomerName.pdf
                             parts = filename.replace(".pdf", "").split("_", 2)
@@ -3688,19 +3771,16 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
                                 "SELECT invoice_id FROM collective_invoice_items WHERE collective_invoice_filename = ?",
                                 (filename,)
                             )
-                            invoice_ids = [row[0] for row in cursor.fetchall()]
-                            for inv_id in invoice_ids:
-                                log_invoice_event(
-                                    db_conn,
-                                    inv_id,
-                                    "COLLECTIVE_INVOICE_SENT",
-                                    {
-                                        "letterxpress_job_id": job_id,
-                                        "price": price,
-                                        "mode": mode,
-                                        "filename": filename
-                                    }
-                                )
+                            metadata = {
+                                "letterxpress_job_id": job_id,
+                                "price": price,
+                                "mode": mode,
+                                "filename": filename
+                            }
+                            log_invoice_events(
+                                db_conn,
+                                ((row[0], "COLLECTIVE_INVOICE_SENT", metadata) for row in cursor.fetchall())
+                            )
 
                             db_conn.commit()
                             logging.info(f"Saved LetterXpress job {job_id} for {filename} to database")
@@ -3884,7 +3964,7 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
 
                     # Save to database
                     try:
-                        with sqlite3.connect(app.config["DATABASE"]) as db_conn:
+                        with open_conn(app.config["DATABASE"]) as db_conn:
                             db_conn.execute(
                                 """
                                 INSERT OR REPLACE INTO mahnungen_letterxpress
@@ -3899,10 +3979,8 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
                                 "SELECT invoice_id, reminder_level FROM reminders WHERE pdf_path = ?",
                                 (relative_path,)
                             )
-                            reminder_rows = cursor.fetchall()
-                            for inv_id, reminder_level in reminder_rows:
-                                log_invoice_event(
-                                    db_conn,
+                            log_invoice_events(db_conn, (
+                                (
                                     inv_id,
                                     "REMINDER_SENT",
                                     {
@@ -3913,6 +3991,8 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
                                         "filename": filename
                                     }
                                 )
+                                for inv_id, reminder_level in cursor.fetchall()
+                            ))
 
                             db_conn.commit()
                             logging.info(f"Saved LetterXpress job {job_id} for {filename} to database")
@@ -3963,7 +4043,7 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
     def get_invoice_history(invoice_id: int):
         """Get the complete history of events for a specific invoice."""
         try:
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 conn.row_factory = sqlite3.Row
                 init_db(conn)
 
@@ -4021,7 +4101,7 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
     def get_invoice_history_pdf(invoice_id: int):
         """Generate a printable PDF of the invoice history."""
         try:
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 conn.row_factory = sqlite3.Row
                 init_db(conn)
 
@@ -4050,7 +4130,6 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
                 invoice_date_formatted = ""
                 if invoice["invoice_date"]:
                     try:
-                        from datetime import datetime
                         dt = datetime.fromisoformat(invoice["invoice_date"].replace('Z', '+00:00'))
                         invoice_date_formatted = dt.strftime('%d.%m.%Y')
                     except:
@@ -4101,7 +4180,7 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
     def toggle_uncollectible(invoice_id: int):
         """Toggle the uncollectible status of an invoice."""
         try:
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 conn.row_factory = sqlite3.Row
                 init_db(conn)
 
@@ -4141,7 +4220,6 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
     @app.route("/pdf/merge")
     def merge_pdfs():
         """Merge multiple PDFs into one for printing."""
-        from pypdf import PdfWriter
         from io import BytesIO
 
         paths_param = request.args.get("paths", "")
@@ -4167,7 +4245,6 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
                 continue
 
             try:
-                from pypdf import PdfReader
                 reader = PdfReader(str(target))
                 for page in reader.pages:
                     pdf_writer.add_page(page)
@@ -4185,7 +4262,7 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
 
         # Log print event in invoice history for all invoices in the processed collective invoices
         try:
-            with sqlite3.connect(app.config["DATABASE"]) as conn:
+            with open_conn(app.config["DATABASE"]) as conn:
                 init_db(conn)
                 for filename in processed_filenames:
                     # Normalize filename
@@ -4201,10 +4278,11 @@ Der Inhalt dieser Nachricht ist vertraulich. Sollte diese Nachricht nicht für S
                     ).fetchall()
 
                     # Log print event for each invoice
-                    for row in invoice_rows:
-                        log_invoice_event(conn, row[0], "COLLECTIVE_INVOICE_PRINTED", {
-                            "collective_invoice": filename
-                        })
+                    metadata = {"collective_invoice": filename}
+                    log_invoice_events(
+                        conn,
+                        ((row[0], "COLLECTIVE_INVOICE_PRINTED", metadata) for row in invoice_rows)
+                    )
 
                 conn.commit()
         except Exception as e: